@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import sys
+from typing import Union
+
+from neutrino_cli.__version__ import __version__
+
+# Directory the caches used to be kept in, inside the build directory
+CACHE_DIR_NAME = '.neutrino_cache'
+
+# Bump when the code generated from a notebook changes, so stale cache entries are not reused
+COMPILER_VERSION = f"{__version__}-3"
+
+# Read buffer for hashing on Pythons without hashlib.file_digest
+HASH_BUFFER_SIZE = 1 << 20
+
+
+def hash_file(file_path: str) -> str:
+    """Create a SHA256 hash of a file."""
+    with open(file_path, 'rb') as f:
+        if sys.version_info >= (3, 11):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+
+        sha256_hash = hashlib.sha256()
+        buffer = bytearray(HASH_BUFFER_SIZE)
+        view = memoryview(buffer)
+        while size := f.readinto(buffer):
+            sha256_hash.update(view[:size])
+        return sha256_hash.hexdigest()
+
+
+def hash_notebook(file_path: str, module_name: str) -> str:
+    """Create the cache key of a notebook from its content, the module it compiles to and the compiler version.
+    The module is part of the key, as it names the code generated from the notebook.
+    """
+    return f"{hash_file(file_path)}-{module_name}-{COMPILER_VERSION}"
+
+
+def hash_source(source: str, formatter: str) -> str:
+    """Create the cache key of a Python source file from its content and the formatter, version included."""
+    return f"{hashlib.sha256(source.encode()).hexdigest()}-{formatter}"
+
+
+def cache_dir(build_dir: str) -> str:
+    """Directory holding the caches of a build, in the user's cache directory.
+
+    Outside the project, the cache is neither part of the Docker build context nor picked up by git. Each build
+    directory gets its own subdirectory, named after the hash of its real path.
+    """
+    user_cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    build_dir_hash = hashlib.sha256(os.path.realpath(build_dir).encode()).hexdigest()[:16]
+    return os.path.join(user_cache_dir, 'neutrino', build_dir_hash)
+
+
+class BuildCache:
+    """Content-hash cache stored as a single JSON index in the project's cache directory."""
+
+    name = 'cache'
+
+    def __init__(self, build_dir: str):
+        self.index_path = os.path.join(cache_dir(build_dir), f'{self.name}.json')
+        self._entries: dict[str, str] = {}
+        self._used: dict[str, str] = {}
+        self._changed = False  # Entries were added or replaced since the index was loaded
+        self.load()
+
+    def load(self) -> None:
+        """Load the cache index from disk, starting empty if it is missing or unreadable."""
+        try:
+            with open(self.index_path, 'r') as f:
+                self._entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._entries = {}
+
+    def get(self, key: str) -> Union[str, None]:
+        """Return the cached value for a key, or None on a miss."""
+        value = self._entries.get(key)
+        if value is not None:
+            self._used[key] = value
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        """Store the value for a key."""
+        if self._entries.get(key) != value:
+            self._changed = True
+        self._entries[key] = value
+        self._used[key] = value
+
+    def save(self, prune: bool = True) -> None:
+        """Write the index to disk in one go. Nothing is written if no entry was added, replaced or dropped.
+
+        Parameters:
+            prune (bool): Drop the entries that weren't used since the index was loaded. Only pass True when the
+                cache was used for everything it holds entries for, such as a full build.
+        """
+        entries = self._used if prune else self._entries
+        if not self._changed and len(entries) == len(self._entries):
+            return
+
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        with open(self.index_path, 'w') as f:
+            json.dump(entries, f)
+
+
+class NotebookCache(BuildCache):
+    """Compiled notebook code, keyed by hash_notebook."""
+
+    name = 'notebooks'
+
+
+class FormatCache(BuildCache):
+    """Formatted code, keyed by hash_source of the unformatted code."""
+
+    name = 'fmt'
+
+
+class BoilerplateCache(BuildCache):
+    """Template input hash of each generated boilerplate file, keyed by file name."""
+
+    name = 'boilerplate_hashes'
@@ -1,52 +1,90 @@
 import hashlib
 import os
 import subprocess
-from collections import defaultdict
+import sys
 from pathlib import Path
-from typing import Union
+from typing import Iterable, Union
 
+from neutrino_cli.compiler.build_cache import BoilerplateCache, hash_file
+from neutrino_cli.compiler.file_utilities import write_file_if_changed
 from neutrino_cli.compiler.templates import DockerfileTemplate, SchedulerTemplate, ConfigTemplate, MainTemplate, \
     WebsocketsManagerTemplate, StartScriptTemplate
 
 
-def hash_file(file_path: str) -> str:
-    """Create a SHA256 hash of a file."""
-    sha256_hash = hashlib.sha256()
-    with open(file_path, 'rb') as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+# Stamp of the requirements.txt in the build directory as last installed, which requirements_changed compares against
+REQUIREMENTS_STAMP_FILE = 'requirements_hash.txt'
 
 
-def requirements_changed(build_dir: str) -> bool:
-    """Check if requirements have changed since the last build."""
+def generated_modules(boilerplate_files: Iterable[str]) -> frozenset[str]:
+    """Names of the Python modules among the boilerplate files, which root notebooks must not compile to."""
+    return frozenset(os.path.splitext(file)[0] for file in boilerplate_files if file.endswith('.py'))
+
+
+def requirements_stamp(requirements_path: str) -> str:
+    """Create the stamp stored in requirements_hash.txt: the mtime, size and hash of a requirements file."""
+    stat = os.stat(requirements_path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}:{hash_file(requirements_path)}"
+
+
+def save_requirements_stamp(build_dir: str) -> None:
+    """Stamp the requirements.txt in the build directory as installed, for requirements_changed to compare against.
+    Only call this once pip installed the requirements successfully.
+    """
     requirements_path = os.path.join(build_dir, 'requirements.txt')
-    hash_file_path = os.path.join(build_dir, 'requirements_hash.txt')
+    write_file_if_changed(os.path.join(build_dir, REQUIREMENTS_STAMP_FILE), requirements_stamp(requirements_path))
+
 
-    # Create hash for the current requirements.txt
-    current_hash = hash_file(requirements_path)
+def requirements_changed(build_dir: str) -> bool:
+    """Check if requirements have changed since they were last installed and stamped by save_requirements_stamp.
+
+    The requirements file is only hashed when its mtime or size differ from the stored stamp.
+    """
+    requirements_path = os.path.join(build_dir, 'requirements.txt')
+    hash_file_path = os.path.join(build_dir, REQUIREMENTS_STAMP_FILE)
 
     try:
-        # Read the previously stored hash
+        # Read the previously stored stamp
         with open(hash_file_path, 'r') as f:
-            previous_hash = f.read().strip()
+            previous_stamp = f.read().strip()
     except FileNotFoundError:
-        previous_hash = None
+        previous_stamp = ''
+
+    # Stamps written by older versions only hold the hash
+    previous_stat, _, previous_hash = previous_stamp.rpartition(':')
+
+    stat = os.stat(requirements_path)
+    if previous_stat == f"{stat.st_mtime_ns}:{stat.st_size}":
+        return False
 
-    return current_hash != previous_hash
+    return hash_file(requirements_path) != previous_hash
 
 
 def install_requirements_from_build(build_dir: str):
     """Installs Python packages from the requirements.txt file in the build directory.
 
+    Nothing is installed if the requirements haven't changed since the last build. pip runs inside the current
+    interpreter when it can be imported, avoiding the start-up of a separate process.
+
     Parameters:
         build_dir (str): Path to the build directory.
     """
     requirements_file_path = f"{build_dir}/requirements.txt"
     print(requirements_file_path)
-    if os.path.exists(requirements_file_path):
-        print("Installing requirements from requirements.txt...")
-        subprocess.run(["pip", "install", "-r", requirements_file_path])
+    if not os.path.exists(requirements_file_path) or not requirements_changed(build_dir):
+        return
+
+    print("Installing requirements from requirements.txt...")
+    pip_args = ["install", "--no-input", "-r", requirements_file_path]
+    try:
+        # Imported here so other commands don't pay for loading pip
+        from pip._internal.cli.main import main as pip_main
+    except ImportError:
+        returncode = subprocess.run([sys.executable, "-m", "pip", *pip_args]).returncode
+    else:
+        returncode = pip_main(pip_args)
+
+    if returncode == 0:
+        save_requirements_stamp(build_dir)
 
 
 def merge_requirements(stock_path: str, user_path: str, output_path: str) -> None:
@@ -57,35 +95,43 @@ def merge_requirements(stock_path: str, user_path: str, output_path: str) -> Non
     :param user_path: File path to the user-defined requirements file
     :param output_path: File path to the output requirements file
     """
+    with open(stock_path, 'r') as f:
+        stock_content = f.read()
+    with open(user_path, 'r') as f:
+        user_content = f.read()
 
-    def parse_requirements(file_path: str) -> defaultdict[str, Union[str, None]]:
-        """
-        Parse a requirements.txt file into a defaultdict.
+    # Write the merged requirements to the output file
+    write_file_if_changed(output_path, merge_requirements_content(stock_content, user_content))
+
+
+def merge_requirements_content(stock_content: str, user_content: str) -> str:
+    """
+    Merge the contents of two requirements.txt files.
+
+    :param stock_content: Content of the stock requirements file
+    :param user_content: Content of the user-defined requirements file
+    :return: Merged requirements, user-defined versions take precedence
+    """
 
-        :param file_path: File path to the requirements file
-        :return: defaultdict of package and version
+    def parse_requirements(content: str) -> dict[str, Union[str, None]]:
         """
-        reqs = defaultdict(lambda: None)
-        with open(file_path, 'r') as f:
-            for line in f.readlines():
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                pkg_info = line.split("==")
-                reqs[pkg_info[0]] = pkg_info[1] if len(pkg_info) > 1 else None
-        return reqs
+        Parse the content of a requirements.txt file into a dict.
 
-    # Parse stock and user requirements
-    stock_reqs = parse_requirements(stock_path)
-    user_reqs = parse_requirements(user_path)
+        :param content: Content of the requirements file
+        :return: dict of package and version
+        """
+        return dict(
+            split_requirement(line)
+            for line in map(str.strip, content.splitlines())
+            if line and not line.startswith("#")
+        )
 
-    # Update stock requirements with user requirements
-    stock_reqs.update(user_reqs)
+    def split_requirement(line: str) -> tuple[str, Union[str, None]]:
+        pkg, _, version = line.partition("==")
+        return pkg, version.partition("==")[0] or None
 
-    # Write the merged requirements to the output file
-    with open(output_path, 'w') as f:
-        for pkg, version in stock_reqs.items():
-            f.write(f"{pkg}{'==' + version if version else ''}\n")
+    merged_reqs = {**parse_requirements(stock_content), **parse_requirements(user_content)}
+    return ''.join(f"{pkg}{'==' + version if version else ''}\n" for pkg, version in merged_reqs.items())
 
 
 def create_boilerplate_files(build_dir: str, boilerplate_files: list[str], root_dir: Path,
@@ -93,36 +139,47 @@ def create_boilerplate_files(build_dir: str, boilerplate_files: list[str], root_
     """
     Creates boilerplate files needed for a FastAPI app.
 
+    Files whose template inputs haven't changed since the last build, and which still hold what was rendered from
+    them, are neither re-rendered nor re-written.
+
     :param ignore_list:
     :param build_dir: Directory where the build resides
     :param boilerplate_files: List of boilerplate files to be created
     :param root_dir: Root directory of the project
     :param config_data: Project config data
     """
+    boilerplate_cache = BoilerplateCache(build_dir)
+
     for file in boilerplate_files:
+        if file == 'main.py':
+            template = MainTemplate(root_dir, ignore_list=ignore_list, config_data=config_data,
+                                    reserved_modules=generated_modules(boilerplate_files))
+        elif file == 'config.py':
+            template = ConfigTemplate(config_data=config_data)
+        elif file == 'Dockerfile':
+            template = DockerfileTemplate(config_data=config_data)
+        elif file == 'scheduler.py':
+            template = SchedulerTemplate()
+        elif file == 'websocket_manager.py':
+            template = WebsocketsManagerTemplate()
+        elif file == 'start.sh':
+            template = StartScriptTemplate()
+        else:
+            continue
+
         file_path = os.path.join(build_dir, file)
-        with open(file_path, 'w') as f:
-            if file == 'main.py':
-                app_main_template = MainTemplate(root_dir, ignore_list=ignore_list, config_data=config_data)
-                content = app_main_template.render()  # Assuming a render() method is available
-                f.write(content)
-            elif file == 'config.py':
-                config_template = ConfigTemplate(config_data=config_data)
-                content = config_template.render()
-                f.write(content)
-            elif file == 'Dockerfile':
-                dockerfile_template = DockerfileTemplate(config_data=config_data)
-                content = dockerfile_template.render()
-                f.write(content)
-            elif file == 'scheduler.py':
-                scheduler_template = SchedulerTemplate()
-                content = scheduler_template.render()
-                f.write(content)
-            elif file == 'websocket_manager.py':
-                manager_template = WebsocketsManagerTemplate()
-                content = manager_template.render()
-                f.write(content)
-            elif file == 'start.sh':
-                start_template = StartScriptTemplate()
-                content = start_template.render()
-                f.write(content)
+        input_hash = template.input_hash()
+        # Cached as "<input hash>:<content hash>", the file is skipped only if nothing overwrote it since
+        cached_input_hash, _, content_hash = (boilerplate_cache.get(file) or '').partition(':')
+        if cached_input_hash == input_hash:
+            try:
+                if hash_file(file_path) == content_hash:
+                    continue
+            except FileNotFoundError:
+                pass
+
+        content = template.render()
+        write_file_if_changed(file_path, content)
+        boilerplate_cache.put(file, f"{input_hash}:{hashlib.sha256(content.encode()).hexdigest()}")
+
+    boilerplate_cache.save()
@@ -1,62 +1,292 @@
 import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import Iterable, Union
 
-import autopep8
-
-from neutrino_cli.compiler.build_setup import merge_requirements, create_boilerplate_files
-from neutrino_cli.compiler.file_utilities import create_init_file, create_dest_dir_if_not_exists, copy_files
-from neutrino_cli.compiler.ignore_handler import should_ignore_file
+from neutrino_cli.compiler.build_setup import merge_requirements_content, create_boilerplate_files, generated_modules
+from neutrino_cli.compiler.file_utilities import render_init_file, create_dest_dir_if_not_exists, copy_files, \
+    compile_notebooks, write_file_if_changed
+from neutrino_cli.compiler.ignore_handler import IgnoreMatcher, LayeredIgnoreMatcher, compile_ignore_list, \
+    read_ignore_list, should_ignore_file
+from neutrino_cli.compiler.build_cache import CACHE_DIR_NAME, FormatCache, NotebookCache, cache_dir, hash_source
 from neutrino_cli.compiler.templates import RequirementsTemplate
+from neutrino_cli.util.log import warn
+
+# Minimum number of files to format before a process pool is used
+MIN_PARALLEL_FORMAT = 4
+
+# Maximum number of files passed to a single `ruff format` run
+RUFF_BATCH_SIZE = 500
+
+BOILERPLATE_FILES = ['main.py', 'config.py', 'Dockerfile', 'scheduler.py', 'websocket_manager.py', 'start.sh']
+
+# Ignore files picked up in subdirectories, scoped to the directory holding them
+IGNORE_FILE_NAME = '.neutrinoignore'
+
+# Files generated at the root of the build, which aren't copied over from the project
+GENERATED_ROOT_FILES = frozenset(BOILERPLATE_FILES + ['requirements.txt'])
+
+# Root notebooks named after one of these would compile over a generated module
+GENERATED_ROOT_MODULES = generated_modules(BOILERPLATE_FILES)
 
 
 def compile_notebooks_into_build(source_path: str, build_dir: str, ignore_list: list[str] = None):
-    source_path = Path(source_path).resolve()
-    build_dir = Path(build_dir).resolve()
+    """Compile the notebooks of a project into the build directory and copy the remaining files over.
+
+    Python files, compiled or copied, are formatted before being compared with the build, so files that didn't change
+    since the last build are not written again.
+    """
+    source_path = os.path.realpath(source_path)
+    build_dir = os.path.realpath(build_dir)
     if ignore_list is None:
         ignore_list = []
+    ignore_matcher = compile_ignore_list(ignore_list)
+
+    # Caches used to live in the build directory, where `COPY . .` put them in the Docker image
+    shutil.rmtree(os.path.join(build_dir, CACHE_DIR_NAME), ignore_errors=True)
+
+    # Gather: mirror the directory tree and copy plain files, collecting the notebooks to compile
+    compile_tasks = []
+    python_files = []
+    # The build, and the cache if the user's cache directory is in the project, are never part of the build
+    excluded_dirs = frozenset((build_dir, cache_dir(build_dir)))
+    for root_dir, rel_dir, files, dir_ignore_matcher in _walk(source_path, ignore_matcher, excluded_dirs):
+        dir_compile_tasks, dir_python_files = process_directory(root_dir, rel_dir, build_dir, files, dir_ignore_matcher)
+        compile_tasks.extend(dir_compile_tasks)
+        python_files.extend(dir_python_files)
+
+    # Execute: compile the notebooks, in parallel when there are enough of them
+    notebook_cache = NotebookCache(build_dir)
+    # Compiled notebooks are formatted below, along with the other Python files
+    python_files.extend(compile_notebooks(compile_tasks, notebook_cache))
+    notebook_cache.save()
+
+    # Format in memory, so only files whose formatted code changed are written
+    formatted_codes = format_python_sources([code for _, code in python_files], build_dir, prune_cache=True)
+    for (dest_file_path, _), formatted_code in zip(python_files, formatted_codes):
+        write_file_if_changed(dest_file_path, formatted_code)
 
-    for root, dirs, files in os.walk(source_path):
-        root_path = Path(root).resolve()
 
-        # Make root_path relative to source_path for proper ignoring
-        relative_root_path = root_path.relative_to(source_path)
+def _walk(source_path: str, ignore_matcher: Union[IgnoreMatcher, LayeredIgnoreMatcher],
+          excluded_dirs: frozenset[str] = frozenset()):
+    """Walk source_path top-down with os.scandir, yielding (root_dir, rel_dir, files, ignore_matcher) for each
+    directory.
 
-        # Explicitly ignore .ipynb_checkpoints directories
-        dirs[:] = [d for d in dirs if d != '.ipynb_checkpoints' and d not in ignore_list]
-        # Skip directories in ignore_list
-        dirs[:] = [d for d in dirs if not should_ignore_file(str((relative_root_path / d).as_posix()), ignore_list)]
+    rel_dir is the posix-style path of root_dir relative to source_path ('' for source_path itself). Ignored
+    directories are not descended into, and entry types come from the cached DirEntry data without extra stats.
+    A .neutrinoignore found in a subdirectory is layered on top of ignore_matcher for that subtree only, so the
+    yielded matcher is the one that applies to the directory's files. Directories in excluded_dirs, given as real
+    paths, are skipped as well.
+    """
+    stack = [(source_path, '', ignore_matcher)]
+    while stack:
+        root_dir, rel_dir, dir_ignore_matcher = stack.pop()
+        dir_entries = []
+        files = []
+        try:
+            with os.scandir(root_dir) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
 
-        process_directory(root_path, source_path, build_dir, files, ignore_list)
+                    if is_dir:
+                        dir_entries.append(entry)
+                        continue
 
+                    files.append(entry.name)
+                    # The root ignore file has already been read by the caller
+                    if rel_dir and entry.name == IGNORE_FILE_NAME:
+                        dir_ignore_matcher = dir_ignore_matcher.with_layer(rel_dir, read_ignore_list(entry.path))
+        except OSError:
+            continue
 
-def process_directory(root_path: Path, source_path: Path, build_dir: Path, files: list[str], ignore_list: list[str]):
-    rel_root = root_path.relative_to(source_path)
-    dest_dir = build_dir / rel_root
+        subdirs = []
+        for entry in dir_entries:
+            # Like os.walk, don't follow symlinked directories
+            if entry.is_symlink():
+                continue
 
-    if should_ignore_file(str(rel_root), ignore_list):
-        return
+            if entry.path in excluded_dirs:
+                continue
+
+            # Skip ignored subtrees entirely
+            rel_subdir = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if dir_ignore_matcher.can_prune(rel_subdir):
+                continue
+
+            subdirs.append((entry.path, rel_subdir, dir_ignore_matcher))
+
+        yield root_dir, rel_dir, files, dir_ignore_matcher
+
+        # Push in reverse so directories are visited in scandir order
+        stack.extend(reversed(subdirs))
+
+
+def process_directory(root_dir: str, rel_dir: str, build_dir: str, files: list[str],
+                      ignore_matcher: Union[IgnoreMatcher, LayeredIgnoreMatcher]
+                      ) -> tuple[list[tuple[str, str, str]], list[tuple[str, str]]]:
+    dest_dir = os.path.join(build_dir, rel_dir) if rel_dir else build_dir
+
+    # Ignored subdirectories have already been pruned by _walk
+    if not rel_dir and should_ignore_file(os.curdir, ignore_matcher):
+        return [], []
 
     create_dest_dir_if_not_exists(dest_dir)
 
+    python_files = []
     # Skip creating __init__.py in the root directory
-    if rel_root and any(file.endswith('.ipynb') for file in files):
-        create_init_file(dest_dir, root_path, build_dir=build_dir)
+    if rel_dir and any(file.endswith('.ipynb') for file in files):
+        python_files.append((os.path.join(dest_dir, "__init__.py"), render_init_file(root_dir)))
+
+    if not rel_dir:
+        files = [file for file in files if not _is_generated_root_file(file, ignore_matcher)]
+
+    package = rel_dir.replace('/', '.')
+    compile_tasks, dir_python_files = copy_files(root_dir, dest_dir, files, ignore_matcher, package=package)
+    python_files.extend(dir_python_files)
+    return compile_tasks, python_files
+
+
+def _is_generated_root_file(file: str, ignore_matcher: Union[IgnoreMatcher, LayeredIgnoreMatcher]) -> bool:
+    """Check if a file at the root of the project would overwrite a file generated by the build."""
+    if file in GENERATED_ROOT_FILES:
+        return True
 
-    copy_files(root_path, dest_dir, files, ignore_list)
+    module, extension = os.path.splitext(file)
+    if extension == '.ipynb' and module in GENERATED_ROOT_MODULES:
+        if not should_ignore_file(file, ignore_matcher):
+            warn("Skipping %s, as it would overwrite the generated %s.py. Rename the notebook to include it.",
+                 file, module)
+        return True
+    return False
 
 
 def format_python_files_in_dir(directory: str):
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.py'):
-                file_path = os.path.join(root, file)
-                with open(file_path, 'r') as f:
-                    code = f.read()
+    file_paths = [
+        os.path.join(root, file)
+        for root, _, files in os.walk(directory)
+        for file in files
+        if file.endswith('.py')
+    ]
+    format_python_files(file_paths, build_dir=directory)
 
-                formatted_code = autopep8.fix_code(code)
 
-                with open(file_path, 'w') as f:
-                    f.write(formatted_code)
+def format_python_files(file_paths: Iterable[str], build_dir: str):
+    """Format the given Python files in place, leaving files that are already formatted untouched.
+
+    Parameters:
+        file_paths (Iterable[str]): Paths of the files to format.
+        build_dir (str): Build directory, whose cache holds the formatted code of sources seen before.
+    """
+    file_paths = list(file_paths)
+    codes = []
+    for file_path in file_paths:
+        with open(file_path, 'r') as f:
+            codes.append(f.read())
+
+    for file_path, formatted_code in zip(file_paths, format_python_sources(codes, build_dir)):
+        write_file_if_changed(file_path, formatted_code)
+
+
+def format_python_sources(codes: list[str], build_dir: str, prune_cache: bool = False) -> list[str]:
+    """Format Python sources in memory, reusing cached output for sources seen before.
+
+    Uses ruff when available, unless the NEUTRINO_FORMATTER environment variable is set to 'autopep8'. The sources
+    missing from the cache are formatted by a single `ruff format` run, or by autopep8.
+
+    Parameters:
+        codes (list[str]): Sources to format.
+        build_dir (str): Build directory, whose cache holds the formatted code of sources seen before.
+        prune_cache (bool): Drop cached code of the sources missing from codes. Only for full builds, where codes
+            holds every Python file of the build.
+
+    Returns:
+        list[str]: The formatted sources, in the order of codes.
+    """
+    ruff_bin = _find_ruff_bin()
+    formatter = _formatter_version(ruff_bin)
+    format_cache = FormatCache(build_dir)
+
+    formatted_codes = []
+    pending = []
+    for i, code in enumerate(codes):
+        key = hash_source(code, formatter)
+        formatted_codes.append(format_cache.get(key))
+        if formatted_codes[-1] is None:
+            pending.append((i, key))
+
+    pending_codes = [codes[i] for i, _ in pending]
+    if ruff_bin is not None:
+        new_codes = _ruff_format(ruff_bin, pending_codes)
+    else:
+        import autopep8
+        # Spinning up a pool costs more than it saves on small builds
+        if len(pending_codes) < MIN_PARALLEL_FORMAT:
+            new_codes = map(autopep8.fix_code, pending_codes)
+        else:
+            with ProcessPoolExecutor() as executor:
+                new_codes = list(executor.map(autopep8.fix_code, pending_codes, chunksize=16))
+
+    for (i, key), formatted_code in zip(pending, new_codes):
+        format_cache.put(key, formatted_code)
+        formatted_codes[i] = formatted_code
+
+    format_cache.save(prune=prune_cache)
+    return formatted_codes
+
+
+def _ruff_format(ruff_bin: str, codes: list[str]) -> list[str]:
+    """Format sources with ruff, in as few runs as possible. Sources ruff can't parse are returned as they are."""
+    if not codes:
+        return []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_paths = [os.path.join(tmp_dir, f"{i}.py") for i in range(len(codes))]
+        for file_path, code in zip(file_paths, codes):
+            with open(file_path, 'w') as f:
+                f.write(code)
+
+        # Batch the paths to stay under command line length limits
+        for i in range(0, len(file_paths), RUFF_BATCH_SIZE):
+            subprocess.run(
+                [ruff_bin, "format", "--isolated", "--no-cache", "--quiet", *file_paths[i:i + RUFF_BATCH_SIZE]],
+                check=False
+            )
+
+        formatted_codes = []
+        for file_path in file_paths:
+            with open(file_path, 'r') as f:
+                formatted_codes.append(f.read())
+        return formatted_codes
+
+
+def _find_ruff_bin() -> Union[str, None]:
+    """Locate the ruff executable, or None if it's missing or autopep8 was requested."""
+    if os.getenv("NEUTRINO_FORMATTER", "ruff") == "autopep8":
+        return None
+
+    try:
+        from ruff.__main__ import find_ruff_bin
+        return os.fsdecode(find_ruff_bin())
+    except (ImportError, FileNotFoundError):
+        return shutil.which("ruff")
+
+
+@lru_cache(maxsize=None)
+def _formatter_version(ruff_bin: Union[str, None]) -> str:
+    """Name and version of the formatter, which formatted code is cached under."""
+    if ruff_bin is None:
+        import autopep8
+        return f"autopep8-{autopep8.__version__}"
+
+    result = subprocess.run([ruff_bin, "--version"], capture_output=True, text=True, check=False)
+    return result.stdout.strip().replace(' ', '-') or "ruff"
 
 
 def merge_project_requirements(source_path: str, build_dir: str):
@@ -66,11 +296,12 @@ def merge_project_requirements(source_path: str, build_dir: str):
     # create new requirements.txt
     requirements_template = RequirementsTemplate()
     requirements_content = requirements_template.render()
-    with open(output_requirements, 'w') as f:
-        f.write(requirements_content)
 
     if os.path.exists(user_requirements):
-        merge_requirements(output_requirements, user_requirements, output_requirements)
+        with open(user_requirements, 'r') as f:
+            requirements_content = merge_requirements_content(requirements_content, f.read())
+
+    write_file_if_changed(output_requirements, requirements_content)
 
 
 def create_boilerplate_files_in_dir(
@@ -79,10 +310,9 @@ def create_boilerplate_files_in_dir(
         ignore_list: list[str] = None,
         config_data: dict = None
 ):
-    boilerplate_files = ['main.py', 'config.py', 'Dockerfile', 'scheduler.py', 'websocket_manager.py', 'start.sh']
     create_boilerplate_files(
         build_dir,
-        boilerplate_files,
+        BOILERPLATE_FILES,
         root_dir=Path(source_path),
         ignore_list=ignore_list,
         config_data=config_data
@@ -1,59 +1,158 @@
+import filecmp
 import os
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Union
 
-from neutrino_cli.compiler.ignore_handler import should_ignore_file
+from neutrino_cli.compiler.ignore_handler import IgnoreMatcher, LayeredIgnoreMatcher, should_ignore_file
+from neutrino_cli.compiler.build_cache import NotebookCache, hash_notebook
 from neutrino_cli.compiler.templates import InitPyTemplate
 from neutrino_cli.parser.parser import compile_notebook_to_py
+from neutrino_cli.util.log import configure_logging
 
+# Minimum number of notebooks to compile before a process pool is used
+MIN_PARALLEL_NOTEBOOKS = 4
 
-def create_dest_dir_if_not_exists(dest_dir: Path):
+
+def create_dest_dir_if_not_exists(dest_dir: Union[str, Path]):
     """Create destination directory if it doesn't exist.
     Parameters:
-        dest_dir (Path): Path to the destination directory.
+        dest_dir (str | Path): Path to the destination directory.
     """
-    if not dest_dir.exists():
+    if not os.path.exists(dest_dir):
         os.makedirs(dest_dir)
 
 
-def create_init_file(dest_dir: Path, root_path: Path, build_dir: Path):
-    """Create __init__.py file in a given directory.
+def render_init_file(root_path: str) -> str:
+    """Render the __init__.py of a package, registering the routers of its notebooks and subpackages.
     Parameters:
-        dest_dir (Path): Path to the destination directory.
-        root_path (Path): Path to the root directory.
-        build_dir (Path): Path to the build directory.
+        root_path (str): Path to the source directory of the package.
     """
-    if dest_dir == build_dir:
-        return
-
-    init_template = InitPyTemplate(directory=root_path)
-    content = init_template.render()
-    init_file_path = dest_dir / "__init__.py"
-    with open(init_file_path, 'w') as f:
-        f.write(content)
+    init_template = InitPyTemplate(directory=Path(root_path))
+    return init_template.render()
 
 
-def copy_files(root_path: Path, dest_dir: Path, files: list[str], ignore_list: list[str]):
-    """Copy or compile files to the destination directory.
+def copy_files(root_path: str, dest_dir: str, files: list[str],
+               ignore_matcher: Union[IgnoreMatcher, LayeredIgnoreMatcher],
+               package: str = '') -> tuple[list[tuple[str, str, str]], list[tuple[str, str]]]:
+    """Copy files to the destination directory, collecting the notebooks that need compiling and the Python files
+    that need formatting, which are not copied.
     Parameters:
-        root_path (Path): Path to the root directory.
-        dest_dir (Path): Path to the destination directory.
+        root_path (str): Path to the root directory.
+        dest_dir (str): Path to the destination directory.
         files (list): List of files to copy.
-        ignore_list (list): List of files and folders to ignore.
+        ignore_matcher (IgnoreMatcher): Compiled list of files and folders to ignore.
+        package (str): Dotted path of the destination directory in the build, '' for the build directory itself.
+
+    Returns:
+        tuple: (notebook path, destination .py path, module name) tasks to pass to compile_notebooks, and
+            (destination path, source code) pairs of the Python files.
     """
+    compile_tasks = []
+    python_files = []
     for file in files:
-        if should_ignore_file(file, ignore_list):
+        if should_ignore_file(file, ignore_matcher):
             continue
 
-        src_file_path = root_path / file
-        dest_file_path = dest_dir / file
+        src_file_path = os.path.join(root_path, file)
+        dest_file_path = os.path.join(dest_dir, file)
 
         if file.endswith('.ipynb'):
             # ignore sandbox files
             if not file.endswith('sandbox.ipynb'):
-                code = compile_notebook_to_py(src_file_path)
-                dest_file_path = dest_file_path.with_suffix('.py')
-                with open(dest_file_path, 'w') as dest_file:
-                    dest_file.write(code)
+                module = os.path.splitext(file)[0]
+                module_name = f"{package}.{module}" if package else module
+                compile_tasks.append((src_file_path, os.path.join(dest_dir, module + '.py'), module_name))
+        elif file.endswith('.py'):
+            with open(src_file_path, 'r') as f:
+                python_files.append((dest_file_path, f.read()))
         else:
-            shutil.copy(src_file_path, dest_file_path)
+            copy_file_if_changed(src_file_path, dest_file_path)
+
+    return compile_tasks, python_files
+
+
+def compile_notebooks(compile_tasks: list[tuple[str, str, str]],
+                      notebook_cache: NotebookCache = None) -> list[tuple[str, str]]:
+    """Compile notebooks to Python code, reusing cached output and fanning cache misses out to a process pool.
+    Parameters:
+        compile_tasks (list): (notebook path, destination .py path, module name) tasks.
+        notebook_cache (NotebookCache, optional): Cache of compiled notebooks, keyed by notebook content.
+
+    Returns:
+        list: (destination .py path, code) pairs, for the caller to format and write.
+    """
+    compiled = []
+    pending = []
+    for src_file_path, dest_file_path, module_name in compile_tasks:
+        key = None
+        if notebook_cache is not None:
+            key = hash_notebook(src_file_path, module_name)
+
+            code = notebook_cache.get(key)
+            if code is not None:
+                compiled.append((dest_file_path, code))
+                continue
+
+        pending.append((src_file_path, dest_file_path, module_name, key))
+
+    src_file_paths = [src_file_path for src_file_path, _, _, _ in pending]
+    module_names = [module_name for _, _, module_name, _ in pending]
+    # Spinning up a pool costs more than it saves on small projects
+    if len(pending) < MIN_PARALLEL_NOTEBOOKS:
+        codes = map(compile_unformatted_notebook, src_file_paths, module_names)
+    else:
+        # Workers started with spawn don't inherit the logging setup
+        with ProcessPoolExecutor(initializer=configure_logging) as executor:
+            codes = list(executor.map(compile_unformatted_notebook, src_file_paths, module_names))
+
+    for (_, dest_file_path, _, key), code in zip(pending, codes):
+        compiled.append((dest_file_path, code))
+        if notebook_cache is not None:
+            notebook_cache.put(key, code)
+
+    return compiled
+
+
+def compile_unformatted_notebook(filepath: str, module_name: str) -> str:
+    """Compile a notebook without running autopep8, leaving the formatting to the build."""
+    return compile_notebook_to_py(filepath, format_code=False, module_name=module_name)
+
+
+def write_file_if_changed(file_path: str, content: str) -> bool:
+    """Write content to a file unless the file already holds exactly that content.
+    Leaving unchanged files alone keeps their mtime, so Docker layers built from them stay cached.
+    Parameters:
+        file_path (str): Path to the file.
+        content (str): Content to write.
+
+    Returns:
+        bool: True if the file was written, False if it was already up to date.
+    """
+    try:
+        with open(file_path, 'r') as f:
+            if f.read() == content:
+                return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+
+    with open(file_path, 'w') as f:
+        f.write(content)
+    return True
+
+
+def copy_file_if_changed(src_file_path: str, dest_file_path: str) -> bool:
+    """Copy a file unless the destination already holds the same content.
+    Parameters:
+        src_file_path (str): Path to the source file.
+        dest_file_path (str): Path to the destination file.
+
+    Returns:
+        bool: True if the file was copied, False if the destination was already up to date.
+    """
+    if os.path.exists(dest_file_path) and filecmp.cmp(src_file_path, dest_file_path, shallow=False):
+        return False
+
+    shutil.copy(src_file_path, dest_file_path)
+    return True
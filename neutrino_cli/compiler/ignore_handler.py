@@ -1,5 +1,8 @@
-import os
-from fnmatch import fnmatchcase
+import re
+from fnmatch import translate
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
 
 
 def read_ignore_list(ignore_file_path: str = '.neutrinoignore') -> list[str]:
@@ -7,41 +10,240 @@ def read_ignore_list(ignore_file_path: str = '.neutrinoignore') -> list[str]:
     Parameters:
         ignore_file_path (str): Path to the ignore file. Defaults to '.neutrinoignore'.
     """
-    if not os.path.exists(ignore_file_path):
+    try:
+        lines = Path(ignore_file_path).read_text().splitlines()
+    except FileNotFoundError:
         return []
 
-    with open(ignore_file_path, 'r') as f:
-        return [line.strip() for line in f.readlines() if line.strip()]
+    return [line for line in map(str.strip, lines) if line]
 
 
-def should_ignore_file(file_path: str, ignore_list: list[str]) -> bool:
-    """Check if a file should be ignored based on the ignore list.
+class _PatternList:
+    """Individually compiled glob patterns, used when they can't be fused into a single regex."""
 
-    Parameters:
-        file_path (str): Path to the file.
-        ignore_list (list): List of patterns to ignore.
+    def __init__(self, patterns: list[str]):
+        self._compiled = [re.compile(translate(pattern)) for pattern in patterns]
 
-    Returns:
-        bool: True if the file should be ignored, False otherwise.
+    def match(self, path: str) -> Union[re.Match, None]:
+        for compiled in self._compiled:
+            match = compiled.match(path)
+            if match:
+                return match
+        return None
+
+
+def _fuse_patterns(patterns: list[str]) -> Union[re.Pattern, _PatternList, None]:
+    """Fuse glob patterns into a single compiled alternation regex, or None if there are no patterns.
+
+    Each pattern is translated and compiled exactly once, bypassing fnmatch's own bounded cache. If the fused
+    regex can't be compiled, the patterns are kept as a list of individually compiled regexes instead.
     """
+    if not patterns:
+        return None
+    try:
+        return re.compile('|'.join(f'(?:{translate(pattern)})' for pattern in patterns))
+    except (re.error, RecursionError, OverflowError):
+        return _PatternList(patterns)
+
+
+class IgnoreTrie:
+    """Character trie of literal directory patterns.
+
+    A directory matches itself and, through matching_prefixes, every path below it.
+    """
+
+    _END = object()
+
+    def __init__(self):
+        self._root = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._root)
+
+    def add(self, prefix: str) -> None:
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[self._END] = True
+
+    def matching_prefixes(self, path: str):
+        """Yield the length of every directory in the trie that is a prefix of path, shortest first."""
+        node = self._root
+        last = len(path) - 1
+        for i, char in enumerate(path):
+            node = node.get(char)
+            if node is None:
+                return
+            if self._END in node and (i == last or path[i + 1] == '/'):
+                yield i + 1
 
-    # Remove comment lines from the ignore list
-    filtered_ignore_list = [pattern for pattern in ignore_list if not pattern.startswith("#")]
 
-    # Process negated patterns (those starting with "!")
-    negated_patterns = [pattern[1:] for pattern in filtered_ignore_list if pattern.startswith("!")]
-    filtered_ignore_list = [pattern for pattern in filtered_ignore_list if not pattern.startswith("!")]
+def _is_glob(pattern: str) -> bool:
+    return any(char in pattern for char in '*?[')
 
-    for pattern in negated_patterns:
-        if fnmatchcase(file_path, pattern):
+
+class IgnoreMatcher:
+    """Compiled form of an ignore list.
+
+    Comment lines are dropped and the remaining patterns are partitioned up front: literal directory patterns
+    (``venv/``) go into an IgnoreTrie, other literal patterns into a set, and only real globs are fused into a
+    regex, so each lookup is a set probe, a short trie walk and at most one C-level ``re.match``.
+    """
+
+    def __init__(self, ignore_list: list[str]):
+        # Directory names that are pruned at any depth, whatever their parent directory
+        self._pruned_names = frozenset(ignore_list) | {'.ipynb_checkpoints'}
+
+        patterns = [pattern for pattern in ignore_list if not pattern.startswith("#")]
+        negated_patterns = [pattern[1:] for pattern in patterns if pattern.startswith("!")]
+        patterns = [pattern for pattern in patterns if not pattern.startswith("!")]
+
+        self._negated = _fuse_patterns(negated_patterns)
+
+        self._exact = set()
+        self._trie = IgnoreTrie()
+        glob_patterns = []
+        for pattern in patterns:
+            # Trailing slashes are removed for directory matching
+            normalized_pattern = pattern.rstrip('/')
+            if _is_glob(pattern):
+                glob_patterns.append(pattern)
+            elif normalized_pattern and pattern.endswith('/'):
+                self._trie.add(normalized_pattern)
+            else:
+                self._exact.add(normalized_pattern)
+
+        self._ignored = _fuse_patterns([pattern.rstrip('/') for pattern in glob_patterns])
+        # Paths that end with a slash are also matched verbatim
+        self._ignored_verbatim = _fuse_patterns(glob_patterns)
+
+        # Match results per path, the same names (__pycache__, .git, ...) come up again and again
+        self._results: dict[str, bool] = {}
+
+    def __call__(self, file_path: str) -> bool:
+        try:
+            return self._results[file_path]
+        except KeyError:
+            result = self._results[file_path] = self._match(file_path)
+            return result
+
+    def _match(self, file_path: str) -> bool:
+        if self._negated is not None and self._negated.match(file_path):
             return False
 
-    for pattern in filtered_ignore_list:
-        # Remove trailing slashes for directory matching
-        normalized_pattern = pattern.rstrip('/')
         normalized_file_path = file_path.rstrip('/')
+        if normalized_file_path in self._exact:
+            return True
 
-        if fnmatchcase(normalized_file_path, normalized_pattern) or fnmatchcase(file_path, pattern):
+        if self._trie:
+            for end in self._trie.matching_prefixes(normalized_file_path):
+                # Paths below a negated directory are not ignored on its account
+                if end == len(normalized_file_path) or self._negated is None or \
+                        not self._negated.match(normalized_file_path[:end]):
+                    return True
+
+        if self._ignored is not None and self._ignored.match(normalized_file_path):
             return True
 
-    return False
+        if self._ignored_verbatim is not None and normalized_file_path != file_path:
+            return self._ignored_verbatim.match(file_path) is not None
+
+        return False
+
+    def can_prune(self, rel_dir: str) -> bool:
+        """Check if a directory and everything below it can be skipped.
+
+        As with .gitignore, a negated pattern can't re-include a path inside an ignored directory, so any ignored
+        directory can be pruned without looking at its contents.
+
+        Parameters:
+            rel_dir (str): Posix-style path of the directory relative to the source root.
+        """
+        return rel_dir.rpartition('/')[2] in self._pruned_names or self(rel_dir)
+
+    def with_layer(self, base_dir: str, ignore_list: list[str]) -> 'LayeredIgnoreMatcher':
+        """Add the patterns of a nested ignore file, scoped to base_dir, on top of this matcher."""
+        return LayeredIgnoreMatcher([('', self), (base_dir, compile_ignore_list(ignore_list))])
+
+    @staticmethod
+    def from_layers(layers: list[tuple[str, list[str]]]) -> 'LayeredIgnoreMatcher':
+        """Compile (base_dir, ignore_list) pairs into a single matcher, '' being the project root.
+
+        Every base_dir should enclose the directories the matcher is used on, as bare file names are checked
+        against all layers.
+        """
+        # Parent directories sort before their children
+        layers = sorted(layers, key=lambda layer: len(layer[0]))
+        return LayeredIgnoreMatcher([(base_dir, compile_ignore_list(ignore_list)) for base_dir, ignore_list in layers])
+
+
+class LayeredIgnoreMatcher:
+    """Ignore lists from nested ignore files, each scoped to the directory holding it.
+
+    A layer applies to its directory the way the root ignore list applies to the project: directories are
+    matched by their path relative to the layer's directory, and file names are matched as they are. Layers
+    are only ever added for the subtree being walked, so every layer applies to the file names it is asked about.
+    As with an ignored directory, a negated pattern in a nested file can't re-include what a parent layer ignores.
+    """
+
+    def __init__(self, layers: list[tuple[str, IgnoreMatcher]]):
+        self._layers = layers
+
+    def __call__(self, file_name: str) -> bool:
+        return any(matcher(file_name) for _, matcher in self._layers)
+
+    def can_prune(self, rel_dir: str) -> bool:
+        """Check if a directory and everything below it can be skipped, according to any of the layers.
+
+        Parameters:
+            rel_dir (str): Posix-style path of the directory relative to the source root.
+        """
+        for base_dir, matcher in self._layers:
+            if not base_dir:
+                scoped_rel_dir = rel_dir
+            elif rel_dir.startswith(base_dir + '/'):
+                scoped_rel_dir = rel_dir[len(base_dir) + 1:]
+            else:
+                continue
+
+            if matcher.can_prune(scoped_rel_dir):
+                return True
+        return False
+
+    def with_layer(self, base_dir: str, ignore_list: list[str]) -> 'LayeredIgnoreMatcher':
+        """Add the patterns of a nested ignore file, scoped to base_dir, on top of this matcher."""
+        return LayeredIgnoreMatcher(self._layers + [(base_dir, compile_ignore_list(ignore_list))])
+
+
+@lru_cache(maxsize=None)
+def _compile_ignore_patterns(ignore_patterns: tuple[str, ...]) -> IgnoreMatcher:
+    return IgnoreMatcher(list(ignore_patterns))
+
+
+def compile_ignore_list(
+        ignore_list: Union[list[str], IgnoreMatcher, LayeredIgnoreMatcher, None]
+) -> Union[IgnoreMatcher, LayeredIgnoreMatcher]:
+    """Compile an ignore list into an IgnoreMatcher.
+
+    Parameters:
+        ignore_list (list): List of patterns to ignore. An already compiled matcher is returned as is.
+
+    Returns:
+        IgnoreMatcher: The compiled matcher, shared between callers passing the same patterns.
+    """
+    if isinstance(ignore_list, (IgnoreMatcher, LayeredIgnoreMatcher)):
+        return ignore_list
+    return _compile_ignore_patterns(tuple(ignore_list or ()))
+
+
+def should_ignore_file(file_path: str, ignore_list: Union[list[str], IgnoreMatcher, LayeredIgnoreMatcher]) -> bool:
+    """Check if a file should be ignored based on the ignore list.
+
+    Parameters:
+        file_path (str): Path to the file.
+        ignore_list (list): List of patterns to ignore, or an IgnoreMatcher compiled from them.
+
+    Returns:
+        bool: True if the file should be ignored, False otherwise.
+    """
+    return compile_ignore_list(ignore_list)(file_path)
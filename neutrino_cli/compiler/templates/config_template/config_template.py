@@ -1,4 +1,4 @@
-from neutrino_cli.compiler.templates.template import Template
+from neutrino_cli.compiler.templates.template import Template, compile_template
 
 
 template = """
@@ -38,6 +38,8 @@ def load_config(mode=os.getenv('ENV', 'prod')):
 config = load_config()
 """
 
+compiled_template = compile_template(template)
+
 
 class ConfigTemplate(Template):
     def __init__(self, config_data: dict = None):
@@ -47,5 +49,5 @@ class ConfigTemplate(Template):
         template_vars = {
             'api_port': config_data.get('api_port', 8080)
         }
-        super().__init__(template_str=template, template_vars=template_vars, is_python=True)
+        super().__init__(template_str=template, template_vars=template_vars, is_python=True, compiled=compiled_template)
 
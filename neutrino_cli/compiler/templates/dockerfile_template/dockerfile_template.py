@@ -60,6 +60,16 @@ RUN chmod +x /start.sh
 CMD ["/start.sh"]"""
 
 
+# Detect the platform once
+if platform.system() == "Darwin":  # Mac OS
+    os_template = mac_template
+elif platform.system() == "Windows":
+    os_template = windows_template
+else:
+    # Optionally handle other platforms or set a default
+    os_template = mac_template  # Set mac_template as default, for example
+
+
 class DockerfileTemplate(Template):
     def __init__(self, config_data: dict = None):
         if not config_data:
@@ -69,13 +79,4 @@ class DockerfileTemplate(Template):
             'api_port': config_data.get('api_port', 8080)
         }
 
-        # Detect the platform
-        if platform.system() == "Darwin":  # Mac OS
-            template_str = mac_template
-        elif platform.system() == "Windows":
-            template_str = windows_template
-        else:
-            # Optionally handle other platforms or set a default
-            template_str = mac_template  # Set mac_template as default, for example
-
-        super().__init__(template_str=template_str, template_vars=template_variables)
+        super().__init__(template_str=os_template, template_vars=template_variables)
@@ -1,6 +1,7 @@
+import os
 from pathlib import Path
 
-from neutrino_cli.compiler.templates.template import Template
+from neutrino_cli.compiler.templates.template import Template, compile_template
 from neutrino_cli.util.strings import to_snake_case
 
 
@@ -24,29 +25,38 @@ router.include_router({{ router_name }}, prefix="{{ url_prefix }}")
 {% endfor %}
 """
 
+compiled_template = compile_template(template)
+
+
 class InitPyTemplate(Template):
     def __init__(self, directory: Path):
         nested_routers = []
         route_files = []
 
+        with os.scandir(directory) as it:
+            entries = list(it)
+
         # For files directly in the directory
         root_files = [
-            file for file in directory.glob("*.ipynb")
-            if file.stem != "__init__" and not file.name.endswith("sandbox.ipynb")
+            entry.name for entry in entries
+            if entry.name.endswith(".ipynb") and entry.is_file()
+            and entry.name != "__init__.ipynb" and not entry.name.endswith("sandbox.ipynb")
         ]
         for root_file in root_files:
-            filename = to_snake_case(root_file.stem)
+            filename = to_snake_case(os.path.splitext(root_file)[0])
             router_name = f"{filename}_router"
             url_prefix = f'/{filename}' if not filename.lower().endswith('routes') else ''
             route_files.append((filename, router_name, url_prefix))
 
         # For subdirectories
-        for subdir in directory.iterdir():
+        for subdir in entries:
             if subdir.is_dir():
-                init_file = subdir / "__init__.py"
-                sub_nested_routers = [file for file in subdir.glob("*.ipynb")]
+                with os.scandir(subdir.path) as it:
+                    names = {entry.name for entry in it}
+                has_init_file = "__init__.py" in names
+                has_nested_routers = any(name.endswith(".ipynb") for name in names)
 
-                if init_file.exists() or sub_nested_routers:
+                if has_init_file or has_nested_routers:
                     subdir_name = to_snake_case(subdir.name)
                     router_name = f'{subdir_name}_router'
                     url_prefix = f'/{subdir_name}' if not subdir_name.lower().endswith('routes') else ''
@@ -57,4 +67,4 @@ class InitPyTemplate(Template):
             "route_files": route_files,
         }
 
-        super().__init__(template_str=template, template_vars=template_vars, is_python=True)
+        super().__init__(template_str=template, template_vars=template_vars, is_python=True, compiled=compiled_template)
@@ -1,7 +1,9 @@
+import os
 from pathlib import Path
+from typing import Iterable
 
 from neutrino_cli.compiler.ignore_handler import should_ignore_file
-from neutrino_cli.compiler.templates.template import Template
+from neutrino_cli.compiler.templates.template import Template, compile_template
 from neutrino_cli.util.strings import to_snake_case
 
 
@@ -35,9 +37,12 @@ if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=config.API_PORT)
 """
 
+compiled_template = compile_template(template)
+
 
 class MainTemplate(Template):
-    def __init__(self, root_dir: Path, ignore_list: list[str] = None, config_data: dict = None):
+    def __init__(self, root_dir: Path, ignore_list: list[str] = None, config_data: dict = None,
+                 reserved_modules: Iterable[str] = ()):
         if not config_data:
             config_data = {}
 
@@ -47,14 +52,22 @@ class MainTemplate(Template):
         import_root_routers = []
         register_root_routers = []
 
-        root_ipynbs = [file for file in root_dir.glob("*.ipynb") if self.is_valid_ipynb_file(file.name, ignore_list)]
+        with os.scandir(root_dir) as it:
+            entries = list(it)
+
+        root_ipynbs = [
+            entry.name for entry in entries
+            if entry.name.endswith(".ipynb") and entry.is_file() and self.is_valid_ipynb_file(entry.name, ignore_list)
+            # Notebooks named like a generated module, e.g. main.ipynb, aren't compiled
+            and os.path.splitext(entry.name)[0] not in reserved_modules
+        ]
         for root_ipynb in root_ipynbs:
-            ipynb_name = to_snake_case(root_ipynb.stem)
+            ipynb_name = to_snake_case(os.path.splitext(root_ipynb)[0])
             router_name = f"{ipynb_name}_router"
             import_root_routers.append(f"from {ipynb_name} import router as {router_name}")
             register_root_routers.append(f"app.include_router({router_name})")
 
-        for subdir in root_dir.iterdir():
+        for subdir in entries:
             if subdir.is_dir() and self.is_valid_subdir(subdir.name, ignore_list):
                 subdir_name = to_snake_case(subdir.name)
 
@@ -70,7 +83,7 @@ class MainTemplate(Template):
             "version": config_data.get('version', '0.0.1'),
         }
 
-        super().__init__(template_str=template, template_vars=template_vars, is_python=True)
+        super().__init__(template_str=template, template_vars=template_vars, is_python=True, compiled=compiled_template)
 
     @staticmethod
     def is_valid_ipynb_file(file_name: str, ignore_list: list[str]) -> bool:
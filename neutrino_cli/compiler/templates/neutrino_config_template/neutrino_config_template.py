@@ -1,4 +1,4 @@
-from neutrino_cli.compiler.templates.template import Template
+from neutrino_cli.compiler.templates.template import Template, compile_template
 
 
 template = """
@@ -9,6 +9,8 @@ project:
         port: {{port}}
 """
 
+compiled_template = compile_template(template)
+
 
 class NeutrinoConfigTemplate(Template):
     def __init__(self, project_name: str):
@@ -16,5 +18,5 @@ class NeutrinoConfigTemplate(Template):
             'project_name': project_name,
             'port': 8080
         }
-        super().__init__(template_str=template, template_vars=template_vars)
+        super().__init__(template_str=template, template_vars=template_vars, compiled=compiled_template)
 
@@ -16,15 +16,15 @@ fastapi
 uvicorn
 python-dotenv
 websockets
+orjson
 APScheduler
 """
 
+# Detect OS once, uvloop isn't available on Windows
+os_template = template if platform.system() == "Windows" else template + "\nuvloop"
+
 
 class RequirementsTemplate(Template):
     def __init__(self):
-        # Detect OS
-        if platform.system() != "Windows":  # Mac OS
-            template += "\nuvloop"
-
         template_vars = {}
-        super().__init__(template_str=template, template_vars=template_vars)
+        super().__init__(template_str=os_template, template_vars=template_vars)
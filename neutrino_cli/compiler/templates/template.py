@@ -1,21 +1,90 @@
-import autopep8
+import hashlib
+import json
+from functools import lru_cache
+from typing import IO, Union
+
+import jinja2
 from jinja2 import Environment
 
+# Shared by every template, building an Environment is far from free
+_ENV = Environment()
+
+# Delimiters of Jinja statements, expressions and comments
+_JINJA_TOKENS = (_ENV.block_start_string, _ENV.variable_start_string, _ENV.comment_start_string)
+
+
+@lru_cache(maxsize=None)
+def compile_template(template_str: str) -> jinja2.Template:
+    """Parse and compile a Jinja template string, once per distinct string."""
+    return _ENV.from_string(template_str)
+
+
+@lru_cache(maxsize=1024)
+def _fix_code(code: str) -> str:
+    """autopep8.fix_code, run once per distinct rendered source."""
+    import autopep8
+    return autopep8.fix_code(code)
+
 
 class Template:
-    def __init__(self, template_str: str, template_vars: dict, is_python: bool = False):
-        self.env = Environment()
+    def __init__(self, template_str: str, template_vars: dict, is_python: bool = False,
+                 compiled: Union[jinja2.Template, None] = None):
+        self.env = _ENV
         self.template_str = template_str  # Template stored as a string
         self.template_vars = template_vars
         self.is_python = is_python
+        self.compiled = compiled  # Precompiled template_str, compiled on first render if not provided
+        # Templates without any Jinja syntax render to themselves, whatever the variables
+        self._static = not any(token in template_str for token in _JINJA_TOKENS)
+
+    def input_hash(self) -> str:
+        """Create a SHA256 hash of everything the rendered output depends on."""
+        formatter_version = False
+        if self.is_python:
+            import autopep8
+            formatter_version = autopep8.__version__
+        inputs = json.dumps(
+            [self.template_str, self.template_vars, formatter_version],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(inputs.encode()).hexdigest()
 
     def render(self):
         try:
-            template = self.env.from_string(self.template_str)
-            code = template.render(self.template_vars)
+            if self._static:
+                # Like Jinja, drop a single trailing newline
+                code = self.template_str[:-1] if self.template_str.endswith('\n') else self.template_str
+            else:
+                template = self.compiled if self.compiled is not None else compile_template(self.template_str)
+                code = template.render(self.template_vars)
             if self.is_python:
-                code = autopep8.fix_code(code)
+                code = _fix_code(code)
             return code.lstrip()
         except Exception as e:
             print(f"Error rendering template: {e}")
             raise
+
+    def render_to(self, fp: IO[str]) -> None:
+        """Render the template straight into an open file.
+
+        Jinja output is streamed chunk by chunk instead of being joined into one string first. Python templates
+        still go through render(), as autopep8 needs the whole source.
+        """
+        if self.is_python or self._static:
+            fp.write(self.render())
+            return
+
+        try:
+            template = self.compiled if self.compiled is not None else compile_template(self.template_str)
+            chunks = template.generate(self.template_vars)
+            # Strip leading whitespace, like render()
+            for chunk in chunks:
+                chunk = chunk.lstrip()
+                if chunk:
+                    fp.write(chunk)
+                    break
+            fp.writelines(chunks)
+        except Exception as e:
+            print(f"Error rendering template: {e}")
+            raise
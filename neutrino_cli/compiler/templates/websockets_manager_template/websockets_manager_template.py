@@ -2,12 +2,44 @@ from neutrino_cli.compiler.templates.template import Template
 
 
 template = '''
+import asyncio
 import json
+import math
+from functools import lru_cache
 from typing import Any, Optional
 
+import orjson
 from fastapi import WebSocket
 
 
+def _dumps(data: Any) -> str:
+    try:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
+    except orjson.JSONEncodeError:
+        # orjson rejects what json.dumps accepts, such as integers beyond 64 bits
+        return json.dumps(data)
+
+
+@lru_cache(maxsize=256, typed=True)
+def _scalar_to_json(data: Any) -> str:
+    if isinstance(data, float) and not math.isfinite(data):
+        # orjson writes these as null, json.dumps as NaN and Infinity
+        return json.dumps(data)
+    return _dumps(data)
+
+
+def to_json(data: Any) -> str:
+    """
+    Serializes a message to a JSON string. Repeated scalar messages, such as heartbeats, are only encoded once.
+
+    Messages orjson can't encode go through json.dumps instead. A NaN or infinite float nested in a container is
+    still sent as null, a bare one as NaN or Infinity like json.dumps does.
+    """
+    if data is None or isinstance(data, (str, int, float)):
+        return _scalar_to_json(data)
+    return _dumps(data)
+
+
 class ConnectionManager:
     """
     Manages WebSocket connections for rooms and individual clients.
@@ -15,6 +47,8 @@ class ConnectionManager:
     def __init__(self):
         # Key: room_id, Value: Dict of client_id to WebSocket
         self.room_connections: dict[str, dict[str, WebSocket]] = {}
+        # Key: id() of a WebSocket, Value: (room_id, client_id) it's connected under. WebSockets aren't hashable.
+        self.websocket_index: dict[int, tuple[str, str]] = {}
 
     async def connect(self, websocket: WebSocket, room_id: str = None, client_id: str = None) -> None:
         """
@@ -33,20 +67,24 @@ class ConnectionManager:
         await websocket.accept()
         if room_id not in self.room_connections:
             self.room_connections[room_id] = {}
+        replaced_websocket = self.room_connections[room_id].get(client_id)
+        if replaced_websocket is not None:
+            self.websocket_index.pop(id(replaced_websocket), None)
         self.room_connections[room_id][client_id] = websocket
+        self.websocket_index[id(websocket)] = (room_id, client_id)
 
     def disconnect(self, websocket: WebSocket, room_id: str = 'default') -> None:
         """
-        Disconnects a client from a room.
+        Disconnects a client from the room it joined.
 
         Parameters:
             websocket (WebSocket): The WebSocket connection.
-            room_id (str, optional): The ID of the room to leave. Defaults to 'default'.
+            room_id (str, optional): Unused, the room is looked up from the connection itself.
         """
-        room = self.room_connections.get(room_id, {})
-        client_id = next((k for k, v in room.items() if v == websocket), None)
-        if client_id is not None:
-            room.pop(client_id)
+        location = self.websocket_index.pop(id(websocket), None)
+        if location is not None:
+            room_id, client_id = location
+            self.room_connections[room_id].pop(client_id, None)
 
     async def send_message(self, message: str, room_id: str = 'default', client_id: str = None) -> None:
         """
@@ -63,8 +101,7 @@ class ConnectionManager:
             if websocket:
                 await websocket.send_text(message)
         else:
-            for websocket in room.values():
-                await websocket.send_text(message)
+            await self._send_concurrently(list(room.values()), message)
 
     async def broadcast_all(self, message: str) -> None:
         """
@@ -73,9 +110,25 @@ class ConnectionManager:
         Parameters:
             message (str): The message to broadcast.
         """
-        for room in self.room_connections.values():
-            for websocket in room.values():
-                await websocket.send_text(message)
+        websockets = [websocket for room in self.room_connections.values() for websocket in room.values()]
+        await self._send_concurrently(websockets, message)
+
+    async def _send_concurrently(self, websockets: list[WebSocket], message: str) -> None:
+        """
+        Sends a message to several clients at once, so a slow client doesn't hold up the others.
+        Clients the message couldn't be sent to are disconnected.
+
+        Parameters:
+            websockets (list[WebSocket]): The WebSocket connections.
+            message (str): The message to send.
+        """
+        results = await asyncio.gather(
+            *(websocket.send_text(message) for websocket in websockets),
+            return_exceptions=True
+        )
+        for websocket, result in zip(websockets, results):
+            if isinstance(result, Exception):
+                self.disconnect(websocket)
                 
     async def handle_error(self, websocket: WebSocket, e: Exception) -> None:
         """
@@ -101,7 +154,7 @@ class ConnectionManager:
         """
         if isinstance(message, tuple) and len(message) == 2:
             data, target = message
-            json_data = json.dumps(data)
+            json_data = to_json(data)
 
             if isinstance(target, (str, int)):
                 await self.send_message(json_data, client_id=str(target))
@@ -116,7 +169,7 @@ class ConnectionManager:
                 elif client_id:
                     await self.send_message(json_data, client_id=client_id)
         else:
-            await self.broadcast_all(json.dumps(message))
+            await self.broadcast_all(to_json(message))
         
         
 manager: ConnectionManager = ConnectionManager()
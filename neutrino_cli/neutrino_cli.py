@@ -9,20 +9,21 @@ import click
 import yaml
 from termcolor import colored
 
-from neutrino_cli.compiler.build_setup import hash_file, requirements_changed
-from neutrino_cli.compiler.compiler import compile_notebooks_into_build, create_dest_dir_if_not_exists, format_python_files_in_dir, \
+from neutrino_cli.compiler.build_setup import requirements_changed, save_requirements_stamp
+from neutrino_cli.compiler.compiler import compile_notebooks_into_build, create_dest_dir_if_not_exists, \
     merge_project_requirements, \
     create_boilerplate_files_in_dir
 from neutrino_cli.compiler.ignore_handler import read_ignore_list
 from neutrino_cli.compiler.templates import NeutrinoIgnoreTemplate, NeutrinoConfigTemplate, GitIgnoreTemplate, \
     PreCommitHookTemplate
 from neutrino_cli.telemetry import Telemetry, telemetry
+from neutrino_cli.util.log import configure_logging
 
 
 @click.group()
 def cli():
     """Neutrino CLI for running and deploying projects."""
-    pass
+    configure_logging()
 
 
 @click.command()
@@ -35,14 +36,17 @@ def init(name: str):
     git_ignore_file_path = '.gitignore'
     success = True
 
+    # List the project directory once instead of probing for each file
+    existing_files = set(os.listdir(os.curdir))
+
     # Check if .neutrinoignore already exists
-    if os.path.exists(ignore_file_path) or os.path.exists(neutrino_config_file_path):
+    if ignore_file_path in existing_files or neutrino_config_file_path in existing_files:
         print(colored("This project already contains a neutrinoconfig.yml.", 'yellow'))
         return
 
     try:
         # Check if .git folder exists, if not, run git init
-        if not os.path.exists(git_folder_path):
+        if git_folder_path not in existing_files:
             subprocess.run(['git', 'init'])
             print(colored(".git initialized.", 'green'))
 
@@ -50,8 +54,7 @@ def init(name: str):
         pre_commit_hook_path = '.git/hooks/pre-commit'
         with open(pre_commit_hook_path, 'w') as f:
             hook_template = PreCommitHookTemplate()
-            content = hook_template.render()
-            f.write(content)
+            hook_template.render_to(f)
             print(colored("Git pre-commit hook created.", 'green'))
 
         # Make the pre-commit hook executable
@@ -59,11 +62,10 @@ def init(name: str):
         print(colored("Git pre-commit hook made executable.", 'green'))
 
         # Check if .gitignore exists, if not, create one
-        if not os.path.exists(git_ignore_file_path):
+        if git_ignore_file_path not in existing_files:
             with open(git_ignore_file_path, 'w') as f:
                 git_ignore_template = GitIgnoreTemplate()
-                content = git_ignore_template.render()
-                f.write(content)
+                git_ignore_template.render_to(f)
             print(colored(".gitignore created.", 'green'))
         else:
             # If .gitignore exists, append /build/ to it
@@ -74,17 +76,15 @@ def init(name: str):
         # Create .neutrinoignore and populate with default ignores
         with open(ignore_file_path, 'w') as f:
             ignore_template = NeutrinoIgnoreTemplate()
-            content = ignore_template.render()
-            f.write(content)
+            ignore_template.render_to(f)
 
         # Create neutrinoconfig.yml
         with open(neutrino_config_file_path, 'w') as f:
             config_template = NeutrinoConfigTemplate(project_name=name)
-            content = config_template.render()
-            f.write(content)
+            config_template.render_to(f)
 
         # Create requirements.txt if it doesn't exist
-        if not os.path.exists('requirements.txt'):
+        if 'requirements.txt' not in existing_files:
             with open('requirements.txt', 'w') as f:
                 f.write("# Add your package requirements here")
                 print(colored("requirements.txt created.", 'green'))
@@ -113,10 +113,13 @@ def build(source: str, pipeline: bool):
 
         # Look for configuration file
         for file_name in ["neutrinoconfig.yml", "neutrino_config.yaml"]:
-            if os.path.exists(file_name):
-                with open(file_name, 'r') as f:
-                    config_data = yaml.safe_load(f)
-                break
+            try:
+                f = open(file_name, 'r')
+            except FileNotFoundError:
+                continue
+            with f:
+                config_data = yaml.safe_load(f)
+            break
 
         if not config_data:
             print(colored("neutrino_config.yaml not found. Using default settings.", 'yellow'))
@@ -129,18 +132,9 @@ def build(source: str, pipeline: bool):
         ignore_list = read_ignore_list()
         compile_notebooks_into_build(source, build_dir, ignore_list)
 
-        format_python_files_in_dir(build_dir)
         merge_project_requirements(source, build_dir)
         create_boilerplate_files_in_dir(source, build_dir, ignore_list=ignore_list, config_data=config_data)
 
-        # Hash the requirements.txt file
-        requirements_path = os.path.join(build_dir, '../requirements.txt')
-        requirements_hash = hash_file(requirements_path)
-
-        # Save the hash for future comparison
-        with open(os.path.join(build_dir, 'requirements_hash.txt'), 'w') as f:
-            f.write(requirements_hash)
-
         print(colored("Build completed successfully.", 'green'))
         success = True
 
@@ -208,9 +202,8 @@ def run(docker, port):
                 print(colored("Requirements have changed, installing...", 'cyan'))
                 subprocess.run(["pip", "install", "-r", "requirements.txt"], check=True)
 
-                # Update the hash file
-                with open(build_dir_absolute / 'requirements_hash.txt', 'w') as f:
-                    f.write(hash_file(str(build_dir_absolute / "requirements.txt")))
+                # Update the stamp
+                save_requirements_stamp(str(build_dir_absolute))
 
             # Run FastAPI app with uvicorn for hot reloading
             subprocess.run(["uvicorn", "main:app", "--reload", "--port", str(port)], check=True)
@@ -0,0 +1,67 @@
+from typing import NamedTuple, Union
+
+
+class Field(NamedTuple):
+    """A field declared in a cell as 'name: type', where a '?' marks the type as optional."""
+    name: str
+    type: Union[str, None]  # None if no type hint was given
+    optional: bool
+
+    def type_hint(self) -> str:
+        type_ = self.type or 'Any'
+        return f"Union[{type_}, None]" if self.optional else type_
+
+
+def parse_field(field: str) -> Field:
+    """Parse a 'name: type' declaration, stripping the '?' and '!' markers from the type."""
+    name, has_type, type_ = field.partition(':')
+    if not has_type:
+        return Field(name=name.strip(), type=None, optional=False)
+
+    return Field(name=name.strip(), type=type_.replace('?', '').replace('!', '').strip(), optional='?' in type_)
+
+
+def parse_fields(fields: Union[str, list[str], dict[str, str], None]) -> list[Field]:
+    """
+    Parse the fields of a cell declaration once, so code generation doesn't have to split them again.
+
+    Parameters:
+        fields (str | list | dict): Comma separated declarations, a list of them, or a mapping keyed by them.
+
+    Returns:
+        list[Field]: The parsed fields.
+    """
+    if isinstance(fields, str):
+        fields = fields.split(',') if fields else []
+    elif not isinstance(fields, (list, dict)):
+        return []
+    return [parse_field(field) for field in fields]
+
+
+def _is_word(name: str) -> bool:
+    return bool(name) and all(char.isalnum() or char == '_' for char in name)
+
+
+def parse_url_params(endpoint: str) -> list[str]:
+    """
+    Find the names of the URL parameters in an endpoint, e.g. "id" in "/items/{id}".
+
+    Parameters:
+        endpoint (str): The endpoint path.
+
+    Returns:
+        list[str]: The parameter names, in order of appearance.
+    """
+    names = []
+    start = endpoint.find('/{')
+    while start >= 0:
+        end = endpoint.find('}', start + 2)
+        if end < 0:
+            break
+        name = endpoint[start + 2:end]
+        if _is_word(name):
+            names.append(name)
+            start = endpoint.find('/{', end + 1)
+        else:
+            start = endpoint.find('/{', start + 1)
+    return names
@@ -1,45 +1,52 @@
-from termcolor import colored
+import hashlib
+from typing import Union
 
-from neutrino_cli.util.ast import get_function_name_from_ast
+from neutrino_cli.util.ast import inspect_function
+from neutrino_cli.util.log import warn
 
 
 class ScheduledCell:
-    # Class-level counter to generate unique function names for code blocks
-    _counter = 0
-
-    def __init__(self, func_body: str, cron: str = None, interval: str = None):
+    def __init__(self, func_body: str, cron: str = None, interval: str = None, name: str = None):
+        """
+        Parameters:
+            func_body (str): The function to schedule, or the code to wrap into one.
+            cron (str, optional): Cron expression to schedule the function with.
+            interval (str, optional): Interval to schedule the function with, e.g. "5m".
+            name (str, optional): Name unique to the cell within the build, used for the generated function and
+                job ids if the cell doesn't define a function. Defaults to a hash of func_body.
+        """
         self.func_body = func_body
         self.cron = cron  # Expecting a string in format "second minute hour day month day_of_week"
         self.interval = interval
+        if name is None:
+            name = hashlib.sha256(func_body.encode()).hexdigest()[:12]
+        self.name = name
+
+        self._func_name = inspect_function(func_body).name
+        # A function defined by the cell is decorated as is, other code becomes the body of a generated function
+        if self._func_name is None:
+            self._body = "    " + func_body.replace("\n", "\n    ")
+        else:
+            self._body = func_body
+        self._cron_dict = self._parse_cron(cron) if cron else None
 
     def __str__(self) -> str:
-        func_name = get_function_name_from_ast(self.func_body)
+        func_name = self._func_name
         is_already_function = func_name is not None
 
         if func_name is None:
-            func_name = f"generated_func_{ScheduledCell._counter}"
-            ScheduledCell._counter += 1
+            # Job ids must be unique across the app, whichever process compiled the notebook and when
+            func_name = f"generated_func_{self.name}"
 
         schedule_def = []
 
         if self.cron:
-            try:
-                cron_fields = self.cron.split(' ')
-                cron_dict = {
-                    'second': cron_fields[0],
-                    'minute': cron_fields[1],
-                    'hour': cron_fields[2],
-                    'day': cron_fields[3],
-                    'month': cron_fields[4],
-                    'day_of_week': cron_fields[5]
-                }
-
-                schedule_def.append(
-                    f"@scheduler.scheduled_job('cron', id='{func_name}_cron', name='{func_name}_cron_job', **{cron_dict})")
-            except IndexError:
-                print(colored("WARNING: Invalid cron format. Not enough fields provided.", 'yellow'))
+            if self._cron_dict is None:
                 return "# Invalid cron format"
 
+            schedule_def.append(
+                f"@scheduler.scheduled_job('cron', id='{func_name}_cron', name='{func_name}_cron_job', **{self._cron_dict})")
+
         elif self.interval:
             schedule_def.append(
                 f"@scheduler.scheduled_job('interval', id='{func_name}_interval', name='{func_name}_interval_job', seconds={self._parse_interval(self.interval)})")
@@ -47,14 +54,34 @@ class ScheduledCell:
         if not is_already_function:
             schedule_def.append(f"async def scheduled_{func_name}():")
 
-        schedule_def.append("    " + self.func_body.replace("\n", "\n    "))
+        schedule_def.append(self._body)
 
         return "\n".join(schedule_def)
 
+    @staticmethod
+    def _parse_cron(cron: str) -> Union[dict[str, str], None]:
+        """
+        Map the fields of a cron expression to the keyword arguments of APScheduler's cron trigger.
+        Returns None if the expression has less than six fields.
+        """
+        try:
+            cron_fields = cron.split(' ')
+            return {
+                'second': cron_fields[0],
+                'minute': cron_fields[1],
+                'hour': cron_fields[2],
+                'day': cron_fields[3],
+                'month': cron_fields[4],
+                'day_of_week': cron_fields[5]
+            }
+        except IndexError:
+            warn("Invalid cron format. Not enough fields provided.")
+            return None
+
     def _check_function_args(self):
-        func_args = get_function_name_from_ast(self.func_body)
+        func_args = self._func_name
         if func_args is None:
-            print(colored("WARNING: Function arguments could not be extracted from AST", 'yellow'))
+            warn("Function arguments could not be extracted from AST")
 
     @staticmethod
     def _parse_interval(interval: str) -> int:
@@ -71,5 +98,5 @@ class ScheduledCell:
         elif unit == 'h':
             return value * 3600
         else:
-            print(colored(f"WARNING: Unsupported interval unit: {unit}. Defaulting to seconds.", 'yellow'))
+            warn("Unsupported interval unit: %s. Defaulting to seconds.", unit)
             return value
@@ -1,7 +1,105 @@
-import re
-from typing import List, Union
-from termcolor import colored
-from neutrino_cli.util.ast import get_function_name_from_ast, is_async_function
+from functools import lru_cache
+from typing import Union
+from neutrino_cli.parser.cells.field import Field, parse_fields, parse_url_params
+from neutrino_cli.util.ast import inspect_function
+from neutrino_cli.util.log import warn
+
+# Parameters the endpoint passes to the connection manager rather than to the streaming wrapper
+_RESERVED_WS_NAMES = frozenset(('room_id', 'client_id'))
+
+# Route wrapping the endpoint body, followed by the cell's function itself
+_ENDPOINT_TEMPLATE = """\
+{models}@router.websocket('{endpoint}')
+async def {func_name}_websocket(websocket: WebSocket{func_params}):
+{code}
+{func_body}"""
+
+# Endpoint body calling the cell's function for every event received
+_EVENT_TEMPLATE = """\
+{id_defaults}    await manager.connect(websocket, room_id, client_id)
+    try:
+        while True:
+            event_data = await websocket.receive_text()
+            response = {await_kw}{func_name}(event_data, {invocation_params})
+            if response is not None:
+                await manager.parse_and_send_message(response)
+    except Exception as e:
+        await manager.handle_error(websocket, e)"""
+
+# Endpoint body streaming what the cell's function yields, without reading any input
+_STREAM_NO_MESSAGE_TEMPLATE = """\
+{streaming_wrapper}
+{id_defaults}    await manager.connect(websocket, room_id, client_id)
+    try:
+        async for response in _streaming_wrapper(websocket, lambda: {func_name}({invocation_params})):
+            if response is not None:
+                await manager.parse_and_send_message(response)
+    except Exception as e:
+        await manager.handle_error(websocket, e)"""
+
+# Closes the try block of every streaming endpoint
+_EXC_HANDLER = (
+    "    except Exception as e:",
+    "        await manager.handle_error(websocket, e)",
+)
+
+# Streaming wrapper of endpoints without a message schema, indented into the endpoint
+_STREAMING_WRAPPER_NO_INPUT = tuple("    " + line for line in """
+async def _streaming_wrapper(websocket: WebSocket, udf: Callable[[], Any]) -> AsyncGenerator[str, None]:
+    while True:
+        async for data in udf():
+            yield data
+        """.lstrip().split("\n"))
+
+# Streaming wrapper of endpoints with a message schema, only the parameters are filled in per cell
+_STREAMING_WRAPPER_TEMPLATE = "\n".join("    " + line for line in """
+async def _streaming_wrapper(websocket: WebSocket, client_id: str, room_id: str, udf: Callable[[str], Any]{signature_addon}) -> AsyncGenerator[str, None]:
+    user_input = {default_value}  # default value
+
+    while True:
+        try:
+            new_input = await asyncio.wait_for(websocket.receive_text(), timeout=1.0)
+            user_input = new_input
+        except asyncio.TimeoutError:
+            pass
+
+        async for data in udf(user_input{additional_params}):
+            yield data
+        """.lstrip().split("\n"))
+
+# Line of the wrapper above that is replaced by _SCHEMA_VALIDATION when messages are validated
+_USER_INPUT_LINE = _STREAMING_WRAPPER_TEMPLATE.split("\n").index("                user_input = new_input")
+
+_SCHEMA_VALIDATION = tuple(f"        {line}" for line in (
+    "        parsed_data = MessageSchema.parse_raw(new_input)",
+    "        user_input = parsed_data.dict()",
+    "    except ValidationError as e:",
+    "        await manager.send_message(json.dumps({'error': str(e)}), room_id, client_id)",
+    "        continue"
+))
+
+
+@lru_cache(maxsize=256)
+def _streaming_wrapper_lines(validate_message_schema: bool, invocation_names: tuple[str, ...]) -> tuple[str, ...]:
+    """Render the streaming wrapper of an endpoint with a message schema, once per distinct parameter list."""
+    additional_params = ', '.join(f"{name}={name}" for name in invocation_names)
+    if additional_params:
+        additional_params = ", " + additional_params
+
+    signature_addon = "".join(
+        f", {name}: Any = None" for name in invocation_names if name and name not in _RESERVED_WS_NAMES
+    )
+
+    lines = tuple(_STREAMING_WRAPPER_TEMPLATE.format(
+        signature_addon=signature_addon,
+        default_value='{}' if validate_message_schema else "''",
+        additional_params=additional_params
+    ).split("\n"))
+
+    if validate_message_schema:
+        # None of the parameters span lines, so the line is still at the same index
+        lines = lines[:_USER_INPUT_LINE] + _SCHEMA_VALIDATION + lines[_USER_INPUT_LINE + 1:]
+    return lines
 
 
 class WebSocketCell:
@@ -16,82 +114,42 @@ class WebSocketCell:
             validate_message_schema: bool = True,
     ):
         self.endpoint = endpoint
+        self._url_params = [(name, 'str') for name in parse_url_params(endpoint)]
         self.ws_type = ws_type
-        self.message_schema = self._parse_fields(message_schema)
-        self.query = self._parse_fields(query)
-        self.headers = self._parse_fields(headers)
+        self.message_schema = parse_fields(message_schema)
+        self.query = parse_fields(query)
+        self.headers = parse_fields(headers)
+        # Names of the query and URL parameters the endpoint receives, in the order they are passed on
+        self._invocation_names = tuple(field.name for field in self.query) + tuple(name for name, _ in self._url_params)
+        self._param_names = frozenset(self._invocation_names)
         self.func_body = func_body
+        self._func_name, _, self._is_async = inspect_function(func_body)
         self.validate_message_schema = validate_message_schema
+        self._rendered = None  # Code generated by the first __str__ call
 
     def _extract_url_params(self) -> list[tuple[any, str]]:
-        return [(name, 'str') for name in re.findall(r"/{([\w]+)}", self.endpoint)]
-
-    @staticmethod
-    def _parse_fields(fields: Union[str, List[str], dict[str, str]]) -> Union[List[str], dict[str, str]]:
-        if isinstance(fields, list):
-            return fields
-        elif isinstance(fields, str):
-            return fields.split(',') if fields else []
-        elif isinstance(fields, dict):
-            return fields
-        else:
-            return []
+        return self._url_params
 
-    def _generate_endpoint_signature(self, func_name: str) -> str:
+    def _generate_endpoint_params(self) -> str:
         """
-        Generate a method signature based on query parameters and URL parameters.
-
-        Parameters:
-            func_name (str): The function name.
-            query_params (List[str]): The query parameters in 'name:type' format.
-            url_params (List[Tuple[str, str]]): The URL parameters as a list of (name, type).
-            return_type (str, optional): The return type of the function. Defaults to "None".
+        Generate the parameters the endpoint takes besides the websocket, from query parameters and URL parameters.
 
         Returns:
-            str: The generated method signature.
+            str: The parameters, each preceded by ', ', or an empty string if there are none.
         """
 
-        def clean_field(field: str) -> tuple[str, str]:
-            parts = field.split(":")
-            name = parts[0].strip()
-            f_type = "Any" if len(parts) == 1 else parts[1].strip()
-            return name, f_type
-
         # Handle query params
-        query_strs = [f"{name}: {f_type}" for field in self.query for name, f_type in [clean_field(field)]]
+        query_strs = [f"{field.name}: {field.type_hint()}" for field in self.query]
 
         # Handle URL params
         url_strs = [f"{name}: str" for name, f_type in self._extract_url_params()]
 
-        all_params = ", ".join(query_strs + url_strs)
-        all_params = f", {all_params}" if all_params else ""
-
-        return f"async def {func_name}_websocket(websocket: WebSocket{all_params}):"
+        return "".join(f", {param}" for param in query_strs + url_strs)
 
     def _generate_func_body_invocation_params(self, skip_room_and_client: bool = False) -> str:
-        def clean_field(field: str) -> tuple[str, str]:
-            parts = field.split(":")
-            f = parts[0].strip()
-            t = "Any"
-            if len(parts) == 2:
-                t = parts[1].strip()
-            return f, t
-
-        # Handling query params
-        query_field_names = [clean_field(field)[0] for field in self.query]
-        if skip_room_and_client:
-            query_field_names = [name for name in query_field_names if name not in ['room_id', 'client_id']]
-        query_params = [f"{name}={name}" for name in query_field_names]
-
-        # Handling URL params
-        url_field_names = [name for name, _ in self._extract_url_params()]
-        if skip_room_and_client:
-            url_field_names = [name for name in url_field_names if name not in ['room_id', 'client_id']]
-        url_params = [f"{name}={name}" for name in url_field_names]
-
-        all_params = query_params + url_params
-
-        return ', '.join(all_params)
+        # Query params first, then URL params
+        skipped = _RESERVED_WS_NAMES if skip_room_and_client else frozenset()
+        return ', '.join(f"{name}={name}" for name in self._invocation_names if name not in skipped)
 
     def _contains_room_and_client_id(self) -> tuple[bool, bool]:
         """
@@ -102,20 +160,11 @@ class WebSocketCell:
                                The first boolean is True if 'room_id' is present, otherwise False.
                                The second boolean is True if 'client_id' is present, otherwise False.
         """
-        def clean_field(field: str) -> str:
-            return field.split(":")[0].strip()
+        return 'room_id' in self._param_names, 'client_id' in self._param_names
 
-        # Handling query params
-        query_params = [clean_field(field) for field in self.query]
-
-        # Handling URL params
-        url_params = [name for name, _ in self._extract_url_params()]
-
-        return 'room_id' in query_params + url_params, 'client_id' in query_params + url_params
-
-    def _generate_code(self) -> list[str]:
+    def _generate_code(self) -> str:
         """Generate code based on ws_type."""
-        func_name = get_function_name_from_ast(self.func_body)
+        func_name = self._func_name
         if self.ws_type == 'event':
             return self._generate_event_code(func_name)
         elif self.ws_type == 'stream' and not self.message_schema:
@@ -133,56 +182,33 @@ class WebSocketCell:
         ]
         return code
 
-    def _generate_event_code(self, func_name: str) -> list[str]:
-        contains_room, contains_client = self._contains_room_and_client_id()
-        code = []
-
-        # Initialize the room_id and client_id variables if they are not expected in the method signature
-        if not contains_room:
-            code.append("    room_id = None")
-        if not contains_client:
-            code.append("    client_id = str(uuid.uuid4())")
-
-        code += [
-            "    await manager.connect(websocket, room_id, client_id)",
-            "    try:",
-            "        while True:",
-            f"            event_data = await websocket.receive_text()",
-            f"            response = {'await ' if is_async_function(self.func_body) else ''}{func_name}(event_data, {self._generate_func_body_invocation_params()})",
-            "            if response is not None:",
-            "                await manager.parse_and_send_message(response)",
-        ]
-
-        # Generate exception handler
-        code += self._handle_exception()
-
-        return code
-
-    def _generate_stream_code_no_message(self, func_name: str) -> list[str]:
+    def _generate_id_defaults(self) -> str:
+        """Initialize the room_id and client_id variables if they are not expected in the method signature."""
         contains_room, contains_client = self._contains_room_and_client_id()
-        code = self._generate_streaming_wrapper_no_input()
-
-        # Initialize room_id and client_id variables if they are not expected in the method signature
+        id_defaults = ""
         if not contains_room:
-            code.append("    room_id = None")
+            id_defaults += "    room_id = None\n"
         if not contains_client:
-            code.append("    client_id = str(uuid.uuid4())")
-
-        # Connection and main loop logic
-        code += [
-            "    await manager.connect(websocket, room_id, client_id)",
-            "    try:",
-            f"        async for response in _streaming_wrapper(websocket, lambda: {func_name}({self._generate_func_body_invocation_params()})):",
-            "            if response is not None:",
-            "                await manager.parse_and_send_message(response)",
-        ]
-
-        # Add exception handling
-        code += self._handle_exception()
-
-        return code
-
-    def _generate_stream_code_with_message(self, func_name: str) -> List[str]:
+            id_defaults += "    client_id = str(uuid.uuid4())\n"
+        return id_defaults
+
+    def _generate_event_code(self, func_name: str) -> str:
+        return _EVENT_TEMPLATE.format(
+            id_defaults=self._generate_id_defaults(),
+            await_kw='await ' if self._is_async else '',
+            func_name=func_name,
+            invocation_params=self._generate_func_body_invocation_params()
+        )
+
+    def _generate_stream_code_no_message(self, func_name: str) -> str:
+        return _STREAM_NO_MESSAGE_TEMPLATE.format(
+            streaming_wrapper="\n".join(self._generate_streaming_wrapper_no_input()),
+            id_defaults=self._generate_id_defaults(),
+            func_name=func_name,
+            invocation_params=self._generate_func_body_invocation_params()
+        )
+
+    def _generate_stream_code_with_message(self, func_name: str) -> str:
         """
         Generate the code for streaming with message validation.
 
@@ -190,17 +216,13 @@ class WebSocketCell:
             func_name (str): Function name to call.
 
         Returns:
-            List[str]: List of code lines.
+            str: The generated code.
         """
         contains_room, contains_client = self._contains_room_and_client_id()
         code = []
 
-        invocation_params = self._generate_func_body_invocation_params()
-        if invocation_params:
-            invocation_params = ", " + invocation_params
-
-        # Streaming wrapper
-        code += self._generate_streaming_wrapper(additional_params=invocation_params)
+        # Streaming wrapper, validating the messages received if validate_message_schema is True
+        code += self._generate_streaming_wrapper()
 
         # Initialize room_id and client_id variables if they are not expected in the method signature
         if not contains_room:
@@ -211,23 +233,6 @@ class WebSocketCell:
         # Manager connection
         code += ["    await manager.connect(websocket, room_id, client_id)"]
 
-        if self.validate_message_schema:
-            schema_validation_code = [
-                "        parsed_data = MessageSchema.parse_raw(new_input)",
-                "        user_input = parsed_data.dict()",
-                "    except ValidationError as e:",
-                "        await manager.send_message(json.dumps({'error': str(e)}), room_id, client_id)",
-                "        continue"
-            ]
-            schema_validation_code = [f"        {line}" for line in schema_validation_code]
-
-            # Find the index where "user_input = new_input" should be
-            idx = next((i for i, line in enumerate(code) if line.strip() == "user_input = new_input"), None)
-
-            if idx is not None:
-                # Replace "user_input = new_input" with validation code
-                code[idx:idx + 1] = schema_validation_code
-
         wrapper_params = self._generate_func_body_invocation_params(skip_room_and_client=True)
         if wrapper_params:
             wrapper_params = ", " + wrapper_params
@@ -242,87 +247,46 @@ class WebSocketCell:
         # Add exception handling
         code += self._handle_exception()
 
-        return code
+        return "\n".join(code)
 
-    def _generate_pydantic_model(self, fields: list[str], class_name: str) -> str:
+    def _generate_pydantic_model(self, fields: list[Field], class_name: str) -> str:
         field_lines = [self._field_to_py_str(field) for field in fields]
         return f"class {class_name}(BaseModel):\n" + "\n".join(field_lines)
 
     @staticmethod
-    def _field_to_py_str(field: str) -> str:
-        if ":" not in field:
-            print(colored(f"WARNING: No type hint provided for field: {field}. Defaulting to 'Any'.", 'yellow'))
-            name = field.strip()
-            type_ = 'Any'
-        else:
-            name, type_ = field.split(":")
-
-        is_optional = '?' in type_
-        type_ = type_.replace('?', '').replace('!', '').strip()
-        return f"    {name.strip()}: {'Union[' + type_ + ', None]' if is_optional else type_}"
+    def _field_to_py_str(field: Field) -> str:
+        if field.type is None:
+            warn("No type hint provided for field: %s. Defaulting to 'Any'.", field.name)
+        return f"    {field.name}: {field.type_hint()}"
 
     @staticmethod
-    def _generate_streaming_wrapper_no_input() -> list[str]:
-        code = """
-async def _streaming_wrapper(websocket: WebSocket, udf: Callable[[], Any]) -> AsyncGenerator[str, None]:
-    while True:
-        async for data in udf():
-            yield data
-        """.lstrip().split("\n")
-
-        code = ["    " + line for line in code]
-        return code
-
-    def _generate_streaming_wrapper(self, additional_params: str = "") -> list[str]:
-        additional_params_signature = additional_params.split(", ")
-        signature_addon = ""
-        for field in additional_params_signature:
-            f_name = field.split("=")[0].strip()
-            if f_name and f_name != "client_id" and f_name != "room_id":
-                signature_addon += f", {f_name}: Any = None"
-
-        code = f"""
-async def _streaming_wrapper(websocket: WebSocket, client_id: str, room_id: str, udf: Callable[[str], Any]{signature_addon}) -> AsyncGenerator[str, None]:
-    user_input = {'{}' if self.validate_message_schema else "''"}  # default value
-
-    while True:
-        try:
-            new_input = await asyncio.wait_for(websocket.receive_text(), timeout=1.0)
-            user_input = new_input
-        except asyncio.TimeoutError:
-            pass
-
-        async for data in udf(user_input{additional_params}):
-            yield data
-        """.lstrip().split("\n")
+    def _generate_streaming_wrapper_no_input() -> tuple[str, ...]:
+        return _STREAMING_WRAPPER_NO_INPUT
 
-        code = ["    " + line for line in code]
-        return code
+    def _generate_streaming_wrapper(self) -> tuple[str, ...]:
+        return _streaming_wrapper_lines(self.validate_message_schema, self._invocation_names)
 
     @staticmethod
-    def _handle_exception() -> List[str]:
-        return [
-            "    except Exception as e:",
-            "        await manager.handle_error(websocket, e)",
-        ]
+    def _handle_exception() -> tuple[str, ...]:
+        return _EXC_HANDLER
 
     def __str__(self) -> str:
-        func_name = get_function_name_from_ast(self.func_body)
-
-        endpoint_def = [f"@router.websocket('{self.endpoint}')"]
-
-        url_and_query_params = self._generate_func_body_invocation_params()
-        func_params = "websocket: WebSocket"
-        if url_and_query_params:
-            func_params += f", {url_and_query_params}"
+        if self._rendered is None:
+            self._rendered = self._render()
+        return self._rendered
 
-        # If message_schema is present and validate_message_schema is True
+    def _render(self) -> str:
+        # If message_schema is present and validate_message_schema is True, the Pydantic schema comes first
         if self.message_schema and self.validate_message_schema:
-            message_schema = self._generate_pydantic_model(self.message_schema, "MessageSchema")
-            endpoint_def = [message_schema] + endpoint_def  # Add Pydantic schema at the beginning
-
-        endpoint_def.append(self._generate_endpoint_signature(func_name=func_name))
-        endpoint_def.extend(self._generate_code())
-        endpoint_def.append(self.func_body)
-
-        return "\n".join(endpoint_def)
+            models = self._generate_pydantic_model(self.message_schema, "MessageSchema") + "\n"
+        else:
+            models = ""
+
+        return _ENDPOINT_TEMPLATE.format(
+            models=models,
+            endpoint=self.endpoint,
+            func_name=self._func_name,
+            func_params=self._generate_endpoint_params(),
+            code=self._generate_code(),
+            func_body=self.func_body
+        )
@@ -1,15 +1,51 @@
+import io
+import mmap
+import os
 import re
-from typing import Union
+from typing import Any, Union
 
-import autopep8
-import nbformat
 import yaml
 from termcolor import colored
 
 from neutrino_cli.parser.cells.scheduled_cell import ScheduledCell
 from neutrino_cli.parser.cells.websocket_cell import WebSocketCell
+from neutrino_cli.util.log import error
 from .cells import Cell, CodeCell, HttpCell
 
+# First line of an HTTP cell declaration, e.g. "GET /items/{id}"
+_HTTP_VERB_RE = re.compile(r'^\s*(GET|POST|PUT|DELETE|PATCH)\b\s*(.*)$')
+
+# orjson parses notebooks several times faster than the standard library
+try:
+    import orjson as _json
+    _JSON_READS_BUFFERS = True  # orjson parses memoryviews, such as a memory-mapped file, without copying them
+except ImportError:
+    import json as _json
+    _JSON_READS_BUFFERS = False
+
+# Characters replaced by underscores when a module name becomes part of an identifier
+_NON_IDENTIFIER_RE = re.compile(r'\W')
+
+# Notebooks at least this large are memory-mapped rather than read into memory, when orjson is available
+MMAP_MIN_SIZE = 1 << 16
+
+# LibYAML's loader is much faster, when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Imports and router every compiled notebook starts with
+_MODULE_HEADER = '\n'.join([
+    'from fastapi import APIRouter, HTTPException, WebSocket',
+    'from pydantic import BaseModel, ValidationError',
+    'from scheduler import scheduler',
+    'from typing import List, Dict, Optional, Union, Any, AsyncGenerator, Callable',
+    'import uuid',
+    'import json\n',
+    'from websocket_manager import manager\n\n\n'
+    'router = APIRouter()\n',
+])
 
 
 def clean_source(lines: list[str]) -> tuple[list[str], list[str]]:
@@ -18,38 +54,35 @@ def clean_source(lines: list[str]) -> tuple[list[str], list[str]]:
     Only the first 'chunk' of comments or first multi-line comment is considered as declaration.
     """
     declaration_lines = []
-    source_lines = []
     inside_multi_line = False
-    first_chunk_collected = False
 
-    for line in lines:
+    for i, line in enumerate(lines):
         stripped_line = line.strip()
 
-        if not first_chunk_collected:
-            if stripped_line.startswith('"""') or stripped_line.startswith("'''"):
-                inside_multi_line = not inside_multi_line
-                if not inside_multi_line:
-                    first_chunk_collected = True
-                continue
-
-            if inside_multi_line or stripped_line.startswith("#"):
-                declaration_lines.append(stripped_line.lstrip('#').strip())
-            else:
-                first_chunk_collected = True
-                source_lines.append(line)  # Keep original indentation in source lines
+        if stripped_line.startswith(('"""', "'''")):
+            inside_multi_line = not inside_multi_line
+            if not inside_multi_line:
+                # The declaration ends with the closing quotes, the rest is source
+                return declaration_lines, lines[i + 1:]
+            continue
+
+        if inside_multi_line or stripped_line.startswith("#"):
+            declaration_lines.append(stripped_line.lstrip('#').strip())
         else:
-            source_lines.append(line)  # Keep original indentation in source lines
+            # Keep original indentation in source lines
+            return declaration_lines, lines[i:]
 
-    return declaration_lines, source_lines
+    return declaration_lines, []
 
 
-def parse_cell(cell_content: dict, filepath: str) -> Union[Cell, None]:
+def parse_cell(cell_content: dict, filepath: str, cell_name: str = None) -> Union[Cell, None]:
     """
     Parses a Jupyter notebook cell to determine its type and content.
 
     Parameters:
     - cell_content (dict): A dictionary containing the cell content. Expects 'source' to be a key in the dict.
     - filepath (str): The path of the file containing the cell, used for error reporting.
+    - cell_name (str, optional): Name unique to the cell within the build, for the code generated from it.
 
     Returns:
     - Union[Cell, None]: Returns an object of type HttpCell, WebSocketCell, ScheduledCell, or CodeCell based on the
@@ -64,21 +97,23 @@ def parse_cell(cell_content: dict, filepath: str) -> Union[Cell, None]:
 
     first_line = cleaned_declaration_lines[0] if cleaned_declaration_lines else None
 
-    if first_line and re.match(r'@HTTP', first_line):
-        if first_line.strip() == '@HTTP':
-            cleaned_declaration_lines.pop(0)  # Remove the line entirely if it only contains @HTTP
-        else:
-            cleaned_declaration_lines[0] = first_line.replace('@HTTP ', '')  # Remove @HTTP but keep the rest
-        return parse_http_cell(cleaned_declaration_lines, source_lines, filepath=filepath)
+    # The declarative is the first word of the declaration, e.g. "@WS" in "@WS /ws/chat"
+    cell_parser = _CELL_PARSERS.get(first_line.split(maxsplit=1)[0]) if first_line else None
+    if cell_parser is None:
+        return CodeCell(source=source)
 
-    elif first_line and re.match(r'@WS', first_line):
-        return parse_websocket_cell(cleaned_declaration_lines, source_lines, filepath=filepath)
+    return cell_parser(cleaned_declaration_lines, source_lines, filepath=filepath, cell_name=cell_name)
 
-    elif first_line and re.match(r'@SCHEDULE', first_line):
-        return parse_scheduled_cell(cleaned_declaration_lines, source_lines, filepath=filepath)
 
-    else:
-        return CodeCell(source=source)
+def load_declaration(declaration_lines: list[str]) -> Any:
+    """
+    Parse the YAML metadata in the declaration lines of a cell.
+    Returns None without invoking the YAML parser if there is no metadata.
+    """
+    declaration = "\n".join(declaration_lines)
+    if not declaration.strip():
+        return None
+    return yaml.load(declaration, Loader=_YamlLoader)
 
 
 def split_types(s: str) -> list[str]:
@@ -88,6 +123,10 @@ def split_types(s: str) -> list[str]:
     :param s:
     :return:
     """
+    # Without brackets every comma separates two types
+    if not any(bracket in s for bracket in '[]{}'):
+        return [part.strip() for part in s.split(',')]
+
     stack = []
     start = 0
     result = []
@@ -104,20 +143,23 @@ def split_types(s: str) -> list[str]:
     return result
 
 
-def parse_http_cell(declaration_lines: list[str], source_lines: list[str], filepath: str) -> Union['HttpCell', None]:
+def parse_http_cell(declaration_lines: list[str], source_lines: list[str], filepath: str,
+                    cell_name: str = None) -> Union['HttpCell', None]:
     http_verb, endpoint = None, None
     cell_dict = {}
 
-    first_line = declaration_lines[0]
-    for x in ['GET', 'POST', 'PUT', 'DELETE', 'PATCH']:
-        if x in first_line:
-            http_verb = x
-            endpoint = first_line.replace(x, '').strip()
-            declaration_lines.pop(0)
-            break
+    if declaration_lines[0].strip() == '@HTTP':
+        declaration_lines.pop(0)  # Remove the line entirely if it only contains @HTTP
+    else:
+        declaration_lines[0] = declaration_lines[0].replace('@HTTP ', '')  # Remove @HTTP but keep the rest
+
+    match = _HTTP_VERB_RE.match(declaration_lines[0])
+    if match:
+        http_verb, endpoint = match.group(1), match.group(2).strip()
+        declaration_lines.pop(0)
 
     try:
-        parsed_yaml = yaml.safe_load("\n".join(declaration_lines))
+        parsed_yaml = load_declaration(declaration_lines)
         if parsed_yaml:
             cell_dict.update(parsed_yaml)
     except yaml.YAMLError as e:
@@ -142,12 +184,17 @@ def parse_http_cell(declaration_lines: list[str], source_lines: list[str], filep
                 endpoint=endpoint,
                 func_body=func_body
             )
+        except SyntaxError as e:
+            # Dropping the cell would build an app without its endpoint or job, so the build fails instead
+            error("Syntax error in a cell of %s:\n%s", filepath, e)
+            raise
         except Exception as e:
             print(colored(f"Error parsing cell in {filepath}:\n{e}", "red"))
             return None
 
 
-def parse_websocket_cell(declaration_lines: list[str], source_lines: list[str], filepath: str) -> Union[WebSocketCell, None]:
+def parse_websocket_cell(declaration_lines: list[str], source_lines: list[str], filepath: str,
+                         cell_name: str = None) -> Union[WebSocketCell, None]:
     endpoint = None
     cell_dict = {}
 
@@ -157,7 +204,7 @@ def parse_websocket_cell(declaration_lines: list[str], source_lines: list[str],
         declaration_lines.pop(0)
 
     try:
-        parsed_yaml = yaml.safe_load("\n".join(declaration_lines))
+        parsed_yaml = load_declaration(declaration_lines)
         if parsed_yaml:
             cell_dict.update(parsed_yaml)
     except yaml.YAMLError as e:
@@ -184,12 +231,17 @@ def parse_websocket_cell(declaration_lines: list[str], source_lines: list[str],
                 headers=cell_dict.get('headers'),
                 validate_message_schema=validate_flag,
             )
+        except SyntaxError as e:
+            # Dropping the cell would build an app without its endpoint or job, so the build fails instead
+            error("Syntax error in a cell of %s:\n%s", filepath, e)
+            raise
         except Exception as e:
             print(f"Error parsing cell in {filepath}:\n{e}")
             return None
 
 
-def parse_scheduled_cell(declaration_lines: list[str], source_lines: list[str], filepath: str) -> Union[ScheduledCell, None]:
+def parse_scheduled_cell(declaration_lines: list[str], source_lines: list[str], filepath: str,
+                         cell_name: str = None) -> Union[ScheduledCell, None]:
     cron = None
     interval = None
 
@@ -214,56 +266,110 @@ def parse_scheduled_cell(declaration_lines: list[str], source_lines: list[str],
             return ScheduledCell(
                 func_body=func_body,
                 cron=cron,
-                interval=interval
+                interval=interval,
+                name=cell_name
             )
+        except SyntaxError as e:
+            # Dropping the cell would build an app without its endpoint or job, so the build fails instead
+            error("Syntax error in a cell of %s:\n%s", filepath, e)
+            raise
         except Exception as e:
             print(colored(f"Error parsing cell in {filepath}:\n{e}", "red"))
             return None
 
 
-def parse_notebook_cells(filepath: str) -> list[str]:
+def read_notebook(filepath: str) -> dict:
+    """
+    Read a notebook as plain JSON, without nbformat's validation and NotebookNode wrappers.
+    Notebooks older than version 4 are still upgraded by nbformat.
+    """
+    with open(filepath, 'rb') as f:
+        if _JSON_READS_BUFFERS and os.fstat(f.fileno()).st_size >= MMAP_MIN_SIZE:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                notebook = _json.loads(view)
+        else:
+            notebook = _json.loads(f.read())
+
+    if notebook.get('nbformat', 4) < 4:
+        import nbformat
+        notebook = nbformat.read(filepath, as_version=4)
+    return notebook
+
+
+# Parser of each cell declarative, called with the declaration lines, the declarative line included, the source lines,
+# the notebook path and the name of the cell
+_CELL_PARSERS = {
+    '@HTTP': parse_http_cell,
+    '@WS': parse_websocket_cell,
+    '@SCHEDULE': parse_scheduled_cell,
+}
+
+
+def parse_notebook_cells(filepath: str, module_name: str = None) -> list[str]:
+    """
+    Parse the code cells of a notebook and generate the code of each.
+
+    Cells are named after module_name, the dotted path of the compiled module in the build, and their position in
+    the notebook, so the names are the same whenever and wherever the notebook is compiled. module_name defaults to
+    the notebook's file name.
+    """
+    if module_name is None:
+        module_name = os.path.splitext(os.path.basename(filepath))[0]
+    cell_name_prefix = _NON_IDENTIFIER_RE.sub('_', module_name)
+
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            notebook = nbformat.read(f, as_version=4)
+        notebook = read_notebook(filepath)
     except FileNotFoundError:
         print(colored(f"Error: Notebook file not found: {filepath}", 'red'))
         return []
-    except nbformat.reader.NotJSONError:
+    except ValueError:
         print(colored(f"Error: Notebook file is not a valid JSON file: {filepath}", 'red'))
         return []
 
     parsed_cells = []
-    for cell in notebook['cells']:
-        if cell['cell_type'] == 'code':
-            parsed_cell = parse_cell(cell, filepath=filepath)
+    for i, cell in enumerate(notebook.get('cells', ())):
+        if cell.get('cell_type') == 'code':
+            # Sources are stored as a list of lines on disk, nbformat used to join them
+            source = cell.get('source', '')
+            if isinstance(source, list):
+                cell['source'] = ''.join(source)
+            parsed_cell = parse_cell(cell, filepath=filepath, cell_name=f"{cell_name_prefix}_{i}")
             if parsed_cell:
                 parsed_cells.append(parsed_cell)
 
-    # Sort so HttpCells appear last
-    sorted_cells = sorted(parsed_cells, key=lambda x: isinstance(x, HttpCell))
+    # HttpCells go last, otherwise keeping the notebook order
+    http_cells = [cell for cell in parsed_cells if isinstance(cell, HttpCell)]
+    other_cells = [cell for cell in parsed_cells if not isinstance(cell, HttpCell)]
 
-    return [str(cell) for cell in sorted_cells]
+    return [str(cell) for cell in other_cells + http_cells]
 
 
-def compile_notebook_to_py(filepath: str) -> str:
-    """Compile the notebook to Python code."""
-    cells = parse_notebook_cells(filepath)
+def compile_notebook_to_py(filepath: str, format_code: bool = True, module_name: str = None) -> str:
+    """
+    Compile the notebook to Python code.
 
-    output_lines = [
-        'from fastapi import APIRouter, HTTPException, WebSocket',
-        'from pydantic import BaseModel, ValidationError',
-        'from scheduler import scheduler',
-        'from typing import List, Dict, Optional, Union, Any, AsyncGenerator, Callable',
-        'import uuid',
-        'import json\n',
-        'from websocket_manager import manager\n\n\n'
-        'router = APIRouter()\n',
-    ]
+    Parameters:
+        filepath (str): Path to the notebook.
+        format_code (bool): Run the code through autopep8. Builds skip this, as they format every Python file in
+            memory before comparing it with the build.
+        module_name (str, optional): Dotted path of the compiled module in the build, which names generated code.
+            Defaults to the notebook's file name.
+    """
+    cells = parse_notebook_cells(filepath, module_name)
+
+    code = io.StringIO()
+    code.write(_MODULE_HEADER)
     for cell in cells:
-        output_lines.append(str(cell))
-        output_lines.append('\n')
+        code.write('\n')
+        code.write(cell)
+        code.write('\n\n')
+
+    if not format_code:
+        return code.getvalue()
 
-    return autopep8.fix_code('\n'.join(output_lines))
+    # Imported here, so parsing notebooks doesn't load autopep8 and its pycodestyle dependency
+    import autopep8
+    return autopep8.fix_code(code.getvalue())
 
 
 if __name__ == "__main__":
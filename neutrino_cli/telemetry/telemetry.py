@@ -1,21 +1,49 @@
+import atexit
 import json
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import requests
 import platform
 from neutrino_cli.__version__ import __version__
 
 ANALYTICS_URL = "https://neutrino-notebooks-analytics-b8d66902d82c.herokuapp.com"
 CLI_CONFIG_PATH = Path(os.path.expanduser("~/.neutrino-config.json"))
 
+# Events are posted in the background over a single kept-alive connection, so the CLI never waits on the network.
+# The session is created by the worker thread, which is also the one paying for importing requests.
+_SESSION = None
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="neutrino-telemetry")
+# Let queued events go out before the process exits
+atexit.register(_EXECUTOR.shutdown, wait=True)
+
+
+def _post_event(payload: dict) -> None:
+    global _SESSION
+    try:
+        if _SESSION is None:
+            import requests
+            _SESSION = requests.Session()
+
+        _SESSION.post(
+            f"{ANALYTICS_URL}/api/cli-analytics/track-cli-action",
+            json=payload,
+            headers={'Content-Type': 'application/json'},
+            timeout=1,
+        )
+    except Exception:
+        pass
+
 
 class Telemetry:
     """Telemetry class for CLI."""
 
     def __init__(self):
         self.config = {}
+        self._dirty = False  # Changed since the config was last saved
         self.load_config()
+        # A user_id created during a command is written once, when the CLI exits
+        atexit.register(self.flush)
 
     def load_config(self) -> None:
         """Load the configuration data from file or create a default configuration."""
@@ -31,15 +59,27 @@ class Telemetry:
             self.save_config()
 
     def save_config(self) -> None:
-        """Save the current configuration data to file."""
-        with open(CLI_CONFIG_PATH, "w") as f:
+        """Save the current configuration data to file.
+
+        The data is written to a temporary file first and moved into place, so the config is never left half
+        written.
+        """
+        tmp_path = CLI_CONFIG_PATH.with_name(CLI_CONFIG_PATH.name + ".tmp")
+        with open(tmp_path, "w") as f:
             json.dump(self.config, f)
+        os.replace(tmp_path, CLI_CONFIG_PATH)
+        self._dirty = False
+
+    def flush(self) -> None:
+        """Save the configuration data if it changed since it was last saved."""
+        if self._dirty:
+            self.save_config()
 
     def get_cli_id(self) -> str:
         """Retrieve or create a unique CLI identifier."""
         if 'user_id' not in self.config:
             self.config['user_id'] = str(uuid.uuid4())
-            self.save_config()
+            self._dirty = True
 
         return self.config['user_id']
 
@@ -54,6 +94,7 @@ class Telemetry:
             status (bool): Whether to enable telemetry.
         """
         self.config["telemetry_enabled"] = status
+        # Saved right away, so an opt-out holds even if the process doesn't exit normally
         self.save_config()
 
     def toggle_traceback(self, status: bool) -> None:
@@ -85,11 +126,7 @@ class Telemetry:
             payload["traceback"] = traceback
 
         try:
-            response = requests.post(
-                f"{ANALYTICS_URL}/api/cli-analytics/track-cli-action",
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=1,
-            )
-        except Exception as e:
+            _EXECUTOR.submit(_post_event, payload)
+        except RuntimeError:
+            # The executor has already been shut down, the process is exiting
             pass
@@ -1,16 +1,56 @@
 import ast
-from typing import Union
+from functools import lru_cache
+from typing import NamedTuple, Union
 
 
-def get_function_name_from_ast(code: str) -> Union[str, None]:
-    """Extract the function name from the given code using AST."""
-    tree = ast.parse(code)
+class FunctionInfo(NamedTuple):
+    """What the code generators need to know about the function defined in a cell."""
+    name: Union[str, None]
+    args: Union[tuple[str, ...], None]
+    is_async: bool
+
+
+def _find_function(tree: ast.Module) -> Union[ast.FunctionDef, ast.AsyncFunctionDef, None]:
+    """Find the first function definition in ast.walk order."""
+    # ast.walk goes breadth first, so a top-level function always comes before any nested one
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            return node
+
     for node in ast.walk(tree):
         if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            return node.name
+            return node
     return None
 
 
+@lru_cache(maxsize=512)
+def inspect_function(code: str) -> FunctionInfo:
+    """
+    Extract the name, argument names and async-ness of the function in the given code, parsing it only once.
+    Cells with the same body share the result.
+
+    Parameters:
+        code (str): The code containing the function definition.
+
+    Returns:
+        FunctionInfo: The function's details, with name and args set to None if no function is found.
+    """
+    node = _find_function(ast.parse(code))
+    if node is None:
+        return FunctionInfo(name=None, args=None, is_async=False)
+
+    return FunctionInfo(
+        name=node.name,
+        args=tuple(arg.arg for arg in node.args.args),
+        is_async=isinstance(node, ast.AsyncFunctionDef)
+    )
+
+
+def get_function_name_from_ast(code: str) -> Union[str, None]:
+    """Extract the function name from the given code using AST."""
+    return inspect_function(code).name
+
+
 def get_function_param_types_from_ast(code: str) -> dict[str, str]:
     """Extract parameter types from function definition."""
     param_types = {}
@@ -34,26 +74,15 @@ def get_function_args_from_ast(code: str) -> Union[list[str], None]:
     Returns:
         List[str]: A list of argument names if the function is found, None otherwise.
     """
-    tree = ast.parse(code)
-    for node in ast.walk(tree):
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            return [arg.arg for arg in node.args.args]
-    return None
+    args = inspect_function(code).args
+    return list(args) if args is not None else None
 
 
 def is_valid_function(code: str) -> bool:
     """Check if the given code contains a valid function."""
-    tree = ast.parse(code)
-    for node in ast.walk(tree):
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            return True
-    return False
+    return inspect_function(code).name is not None
 
 
 def is_async_function(code: str) -> bool:
     """Check if the given code contains an async function."""
-    tree = ast.parse(code)
-    for node in ast.walk(tree):
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            return isinstance(node, ast.AsyncFunctionDef)
-    return False
+    return inspect_function(code).is_async
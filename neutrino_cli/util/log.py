@@ -0,0 +1,54 @@
+import logging
+import sys
+
+from termcolor import colored
+
+log = logging.getLogger('neutrino')
+
+
+class ColoredFormatter(logging.Formatter):
+    """Prefix messages with their level, colored by severity."""
+
+    _COLORS = {logging.WARNING: 'yellow', logging.ERROR: 'red', logging.CRITICAL: 'red'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        color = self._COLORS.get(record.levelno)
+        return colored(message, color) if color else message
+
+
+class StdoutHandler(logging.StreamHandler):
+    """Write to sys.stdout as it is when a record is emitted, like print does, so redirected output is followed."""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, _):
+        pass
+
+
+def configure_logging(level: int = logging.WARNING) -> None:
+    """Print the CLI's log records to stdout, once, however often this is called."""
+    if log.handlers:
+        return
+
+    handler = StdoutHandler()
+    handler.setFormatter(ColoredFormatter('%(levelname)s: %(message)s'))
+    log.addHandler(handler)
+    log.setLevel(level)
+    log.propagate = False
+
+
+def warn(msg: str, *args) -> None:
+    """Log a warning, the arguments are only interpolated into msg if it is printed."""
+    # The compiler can be used without going through the CLI, which configures logging
+    configure_logging()
+    log.warning(msg, *args)
+
+
+def error(msg: str, *args) -> None:
+    """Log an error, the arguments are only interpolated into msg if it is printed."""
+    configure_logging()
+    log.error(msg, *args)
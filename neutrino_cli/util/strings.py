@@ -1,6 +1,11 @@
 import re
+from functools import lru_cache
 
+# Positions before an uppercase letter, except at the start, and whitespace or dashes, all of which become '_'
+_SNAKE_CASE_RE = re.compile(r'(?<!^)(?=[A-Z])|[\s-]')
 
+
+@lru_cache(maxsize=1024)
 def snake_to_pascal(snake_str: str) -> str:
     """
     Converts a snake_case string to PascalCase.
@@ -11,10 +16,10 @@ def snake_to_pascal(snake_str: str) -> str:
     Returns:
         str: The converted PascalCase string.
     """
-    components = snake_str.split('_')
-    return ''.join(x.title() for x in components)
+    return ''.join(map(str.title, snake_str.split('_')))
 
 
+@lru_cache(maxsize=1024)
 def to_snake_case(string: str) -> str:
     """
     Converts a string to snake_case
@@ -25,6 +30,4 @@ def to_snake_case(string: str) -> str:
     Returns:
         str: The converted snake_case string.
     """
-    string = re.sub(r'(?<!^)(?=[A-Z])', '_', string).lower()
-    string = re.sub(r'[\s-]', '_', string).lower()
-    return string
+    return _SNAKE_CASE_RE.sub('_', string).lower()
@@ -12,7 +12,9 @@ setup(
     install_requires=[
         'click',
         'nbformat',
+        'orjson',
         'autopep8',
+        'ruff',
         'python-dotenv',
         'termcolor',
         'Jinja2',
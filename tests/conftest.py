@@ -0,0 +1,94 @@
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from neutrino_cli.compiler.templates import NeutrinoIgnoreTemplate
+from neutrino_cli.neutrino_cli import cli
+from neutrino_cli.telemetry import telemetry
+
+HTTP_CELL = '''# @HTTP GET /items/{item_id}
+# query: q:str
+def get_item(item_id, q):
+    return {"id": item_id}'''
+
+SCHEDULED_CELL = '''# @SCHEDULE
+# interval: 5m
+def job():
+    pass'''
+
+
+def write_notebook(path, *sources: str) -> None:
+    """Write a notebook with one code cell per source."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    notebook = {
+        'nbformat': 4,
+        'nbformat_minor': 5,
+        'metadata': {},
+        'cells': [
+            {'cell_type': 'code', 'metadata': {}, 'execution_count': None, 'outputs': [], 'source': source}
+            for source in sources
+        ],
+    }
+    with open(path, 'w') as f:
+        json.dump(notebook, f)
+
+
+def file_mtimes(directory) -> dict[str, int]:
+    """mtime of every file under directory, keyed by the path relative to it."""
+    return {
+        os.path.relpath(os.path.join(root, file), directory): os.stat(os.path.join(root, file)).st_mtime_ns
+        for root, _, files in os.walk(directory)
+        for file in files
+    }
+
+
+def age_files(directory, seconds: int = 60) -> None:
+    """Move the mtime of every file under directory back, so a rewrite shows even on coarse filesystem clocks."""
+    for path in file_mtimes(directory):
+        path = os.path.join(directory, path)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - seconds * 10 ** 9))
+
+
+@pytest.fixture(autouse=True)
+def no_telemetry(monkeypatch):
+    monkeypatch.setitem(telemetry.config, 'telemetry_enabled', False)
+
+
+@pytest.fixture(autouse=True)
+def user_cache_dir(tmp_path_factory, monkeypatch):
+    """Keep build caches out of the user's cache directory, and out of the test project."""
+    user_cache_dir = tmp_path_factory.mktemp('cache')
+    monkeypatch.setenv('XDG_CACHE_HOME', str(user_cache_dir))
+    return user_cache_dir
+
+
+@pytest.fixture(params=['ruff', 'autopep8'])
+def formatter(request, monkeypatch):
+    monkeypatch.setenv('NEUTRINO_FORMATTER', request.param)
+    return request.param
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """A project with root and nested notebooks and plain Python modules, used as the working directory."""
+    write_notebook(tmp_path / 'api.ipynb', 'import math\nX = 1', HTTP_CELL, SCHEDULED_CELL)
+    write_notebook(tmp_path / 'user_routes' / 'users.ipynb', HTTP_CELL)
+    (tmp_path / 'helper.py').write_text('def helper( x ):\n  return x\n')
+    (tmp_path / 'user_routes' / 'util.py').write_text('Y = [1,2]\n')
+    (tmp_path / 'requirements.txt').write_text('numpy==1.0\n')
+    (tmp_path / '.neutrinoignore').write_text(NeutrinoIgnoreTemplate().render())
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def build(project):
+    """Build the project, failing the test if the build doesn't succeed."""
+    def run_build():
+        result = CliRunner().invoke(cli, ['build', '--source', str(project)])
+        assert 'Build completed successfully.' in result.output, result.output
+        return project / 'build'
+    return run_build
@@ -0,0 +1,26 @@
+from conftest import HTTP_CELL, write_notebook
+
+
+def test_root_notebook_named_like_boilerplate_is_skipped(project, build):
+    write_notebook(project / 'main.ipynb', HTTP_CELL)
+    write_notebook(project / 'scheduler.ipynb', HTTP_CELL)
+
+    build_dir = build()
+
+    main_py = (build_dir / 'main.py').read_text()
+    assert 'app = FastAPI(' in main_py
+    assert 'from main import' not in main_py
+    assert 'from scheduler import router' not in main_py
+    assert 'get_item' not in (build_dir / 'scheduler.py').read_text()
+
+
+def test_overwritten_boilerplate_is_restored(project, build):
+    build_dir = build()
+    main_py = (build_dir / 'main.py').read_text()
+    (build_dir / 'main.py').write_text('router = None\n')
+    (build_dir / 'start.sh').unlink()
+
+    build()
+
+    assert (build_dir / 'main.py').read_text() == main_py
+    assert (build_dir / 'start.sh').exists()
@@ -0,0 +1,93 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+from conftest import HTTP_CELL, file_mtimes, write_notebook
+
+from click.testing import CliRunner
+
+import neutrino_cli
+from neutrino_cli.neutrino_cli import cli
+
+GENERATED_SCHEDULED_CELL = '''# @SCHEDULE
+# interval: 1h
+print("tick")'''
+
+
+def test_rebuild_leaves_unchanged_files_untouched(project, build, formatter):
+    build_dir = build()
+    mtimes = file_mtimes(build_dir)
+
+    build()
+
+    assert file_mtimes(build_dir) == mtimes
+
+
+def test_rebuild_only_writes_changed_files(project, build, formatter):
+    build_dir = build()
+    mtimes = file_mtimes(build_dir)
+
+    write_notebook(project / 'user_routes' / 'users.ipynb', HTTP_CELL.replace('get_item', 'get_user'))
+    build()
+
+    new_mtimes = file_mtimes(build_dir)
+    assert [path for path in mtimes if new_mtimes[path] != mtimes[path]] == ['user_routes/users.py']
+    assert 'def get_user(' in (build_dir / 'user_routes' / 'users.py').read_text()
+
+
+def test_python_files_are_formatted(project, build, formatter):
+    build_dir = build()
+
+    assert (build_dir / 'helper.py').read_text() == 'def helper(x):\n    return x\n'
+    assert 'def get_item(item_id, q):' in (build_dir / 'api.py').read_text()
+
+
+def test_build_is_not_copied_into_itself(project, build):
+    (project / '.neutrinoignore').unlink()
+
+    build_dir = build()
+    build()
+
+    assert not (build_dir / 'build').exists()
+    assert not (build_dir / '.neutrino_cache').exists()
+
+
+def test_cell_with_syntax_error_fails_the_build(project):
+    write_notebook(project / 'ws.ipynb', '# @WS /ws\nasync def on_message(:\n    pass')
+
+    result = CliRunner().invoke(cli, ['build', '--source', str(project)])
+
+    assert 'Build completed successfully.' not in result.output
+    assert 'Syntax error in a cell of' in result.output
+
+
+def test_scheduled_job_ids_are_unique_across_rebuilds(project, tmp_path_factory):
+    home = tmp_path_factory.mktemp('home')
+    package_root = os.path.dirname(os.path.dirname(neutrino_cli.__file__))
+    (home / '.neutrino-config.json').write_text(json.dumps({'telemetry_enabled': False}))
+
+    def build_in_new_process():
+        # Each CLI run is a new process, so nothing carries over from one build to the next
+        result = subprocess.run(
+            [sys.executable, '-c', 'from neutrino_cli import cli; cli()', 'build', '--source', str(project)],
+            capture_output=True, text=True, env={**os.environ, 'HOME': str(home), 'PYTHONPATH': package_root},
+        )
+        assert 'Build completed successfully.' in result.stdout, result.stdout + result.stderr
+        return project / 'build'
+
+    write_notebook(project / 'root_jobs.ipynb', GENERATED_SCHEDULED_CELL)
+    build_in_new_process()
+
+    # The new notebook is compiled while the other one comes from the cache
+    write_notebook(project / 'routes' / 'nb_c.ipynb', HTTP_CELL, GENERATED_SCHEDULED_CELL)
+    build_dir = build_in_new_process()
+
+    job_ids = [
+        job_id
+        for path in file_mtimes(build_dir) if path.endswith('.py')
+        for job_id in re.findall(r"""\bid=['"](\w+)['"]""", (build_dir / path).read_text())
+    ]
+    # A generated job in each of the two notebooks, and the project's own job
+    assert len(job_ids) == len(set(job_ids)) == 3
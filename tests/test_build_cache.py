@@ -0,0 +1,49 @@
+import os
+
+from conftest import age_files, file_mtimes
+
+from neutrino_cli.compiler.build_cache import CACHE_DIR_NAME, NotebookCache, cache_dir
+
+
+def test_cache_is_kept_out_of_the_project(project, build, user_cache_dir):
+    build_dir = build()
+
+    build_cache_dir = cache_dir(str(build_dir))
+    assert build_cache_dir.startswith(str(user_cache_dir))
+    assert os.path.exists(os.path.join(build_cache_dir, 'notebooks.json'))
+    assert not any(path.endswith('.json') for path in file_mtimes(project))
+
+
+def test_stale_cache_is_removed_from_the_build(project, build):
+    stale_index = project / 'build' / CACHE_DIR_NAME / 'notebooks.json'
+    stale_index.parent.mkdir(parents=True)
+    stale_index.write_text('{}')
+
+    build()
+
+    assert not stale_index.parent.exists()
+
+
+def test_unchanged_index_is_not_rewritten(project, build):
+    build()
+    build_cache_dir = cache_dir(str(project / 'build'))
+    age_files(build_cache_dir)
+    mtimes = file_mtimes(build_cache_dir)
+
+    build()
+
+    assert file_mtimes(build_cache_dir) == mtimes
+
+
+def test_index_is_written_when_entries_are_dropped(tmp_path):
+    build_dir = str(tmp_path / 'build')
+    cache = NotebookCache(build_dir)
+    cache.put('a', 'code a')
+    cache.put('b', 'code b')
+    cache.save()
+
+    cache = NotebookCache(build_dir)
+    cache.get('a')
+    cache.save()
+
+    assert NotebookCache(build_dir).get('b') is None
@@ -0,0 +1,64 @@
+import os
+
+from conftest import age_files, file_mtimes
+
+from neutrino_cli.compiler.build_cache import FormatCache, hash_source
+from neutrino_cli.compiler.compiler import _find_ruff_bin, _formatter_version, format_python_files, \
+    format_python_sources
+
+UNFORMATTED = 'def f( x ):\n  return [x,1]\n'
+
+
+def test_sources_are_formatted_and_cached(tmp_path, formatter):
+    build_dir = str(tmp_path / 'build')
+
+    formatted_code, = format_python_sources([UNFORMATTED], build_dir)
+
+    assert formatted_code.startswith('def f(x):\n')
+    key = hash_source(UNFORMATTED, _formatter_version(_find_ruff_bin()))
+    assert FormatCache(build_dir).get(key) == formatted_code
+
+
+def test_formatted_files_are_left_untouched(tmp_path, formatter):
+    build_dir = tmp_path / 'build'
+    build_dir.mkdir()
+    formatted_code, = format_python_sources([UNFORMATTED], str(build_dir))
+    (build_dir / 'formatted.py').write_text(formatted_code)
+    (build_dir / 'unformatted.py').write_text(UNFORMATTED)
+    age_files(build_dir)
+    mtimes = file_mtimes(build_dir)
+
+    format_python_files([str(build_dir / 'formatted.py'), str(build_dir / 'unformatted.py')], str(build_dir))
+
+    assert (build_dir / 'unformatted.py').read_text() == formatted_code
+    new_mtimes = file_mtimes(build_dir)
+    assert new_mtimes['formatted.py'] == mtimes['formatted.py']
+    assert new_mtimes['unformatted.py'] != mtimes['unformatted.py']
+
+
+def test_unparsable_source_is_returned_as_is(tmp_path, formatter):
+    code = 'def f(:\n'
+
+    assert format_python_sources([code], os.fspath(tmp_path / 'build')) == [code]
+
+
+def test_partial_format_keeps_other_cached_sources(tmp_path, formatter):
+    build_dir = str(tmp_path / 'build')
+    other_code = 'X = [1,2]\n'
+    format_python_sources([UNFORMATTED, other_code], build_dir, prune_cache=True)
+
+    format_python_sources([UNFORMATTED], build_dir)
+
+    key = hash_source(other_code, _formatter_version(_find_ruff_bin()))
+    assert FormatCache(build_dir).get(key) is not None
+
+
+def test_full_build_prunes_unused_sources(tmp_path, formatter):
+    build_dir = str(tmp_path / 'build')
+    other_code = 'X = [1,2]\n'
+    format_python_sources([UNFORMATTED, other_code], build_dir, prune_cache=True)
+
+    format_python_sources([UNFORMATTED], build_dir, prune_cache=True)
+
+    key = hash_source(other_code, _formatter_version(_find_ruff_bin()))
+    assert FormatCache(build_dir).get(key) is None
@@ -0,0 +1,9 @@
+from neutrino_cli.util.log import log, warn
+
+
+def test_warnings_are_printed_without_configuring_logging(monkeypatch, capsys):
+    monkeypatch.setattr(log, 'handlers', [])
+
+    warn("No type hint provided for field: %s. Defaulting to 'Any'.", 'name')
+
+    assert "WARNING: No type hint provided for field: name. Defaulting to 'Any'." in capsys.readouterr().out
@@ -0,0 +1,26 @@
+import ast
+
+import pytest
+
+from conftest import HTTP_CELL, SCHEDULED_CELL, write_notebook
+
+from neutrino_cli.parser.parser import compile_notebook_to_py
+
+
+def test_unformatted_code_is_valid_python(tmp_path):
+    notebook_path = tmp_path / 'api.ipynb'
+    write_notebook(notebook_path, HTTP_CELL, SCHEDULED_CELL, '# @SCHEDULE\n# interval: 1h\nprint("tick")')
+
+    code = compile_notebook_to_py(str(notebook_path), format_code=False)
+
+    functions = {node.name for node in ast.walk(ast.parse(code)) if isinstance(node, ast.FunctionDef)}
+    assert {'get_item', 'job'} <= functions
+
+
+@pytest.mark.parametrize('declaration', ['# @HTTP GET /items', '# @WS /ws', '# @SCHEDULE\n# interval: 5m'])
+def test_cell_with_syntax_error_is_not_dropped(tmp_path, declaration):
+    notebook_path = tmp_path / 'api.ipynb'
+    write_notebook(notebook_path, f'{declaration}\ndef handler(:\n    pass')
+
+    with pytest.raises(SyntaxError):
+        compile_notebook_to_py(str(notebook_path), format_code=False)
@@ -0,0 +1,36 @@
+from neutrino_cli.compiler import build_setup
+from neutrino_cli.compiler.build_setup import requirements_changed, save_requirements_stamp
+
+
+def test_build_does_not_mark_requirements_as_installed(project, build):
+    build()
+    with open(project / 'requirements.txt', 'a') as f:
+        f.write('pendulum==3.0\n')
+
+    build_dir = build()
+
+    assert requirements_changed(str(build_dir))
+
+
+def test_requirements_unchanged_after_install(project, build, monkeypatch):
+    build_dir = build()
+    save_requirements_stamp(str(build_dir))
+    build()
+
+    def fail_hash_file(file_path):
+        raise AssertionError(f"{file_path} was hashed, although its stamp matches")
+
+    # The stamp matches the requirements' mtime and size, so they don't need hashing
+    monkeypatch.setattr(build_setup, 'hash_file', fail_hash_file)
+    assert not requirements_changed(str(build_dir))
+
+
+def test_new_requirement_after_install_is_detected(project, build):
+    build_dir = build()
+    save_requirements_stamp(str(build_dir))
+
+    with open(project / 'requirements.txt', 'a') as f:
+        f.write('pendulum==3.0\n')
+    build()
+
+    assert requirements_changed(str(build_dir))
@@ -0,0 +1,37 @@
+import json
+import sys
+
+import pytest
+
+from neutrino_cli.telemetry import Telemetry
+
+telemetry_module = sys.modules['neutrino_cli.telemetry.telemetry']
+
+
+@pytest.fixture
+def config_path(tmp_path, monkeypatch):
+    config_path = tmp_path / '.neutrino-config.json'
+    monkeypatch.setattr(telemetry_module, 'CLI_CONFIG_PATH', config_path)
+    return config_path
+
+
+def test_toggles_are_saved_right_away(config_path):
+    telemetry = Telemetry()
+
+    telemetry.toggle_telemetry(False)
+    telemetry.toggle_traceback(True)
+
+    config = json.loads(config_path.read_text())
+    assert config['telemetry_enabled'] is False
+    assert config['include_traceback'] is True
+
+
+def test_created_user_id_is_saved_on_flush(config_path):
+    config_path.write_text(json.dumps({'telemetry_enabled': False}))
+    telemetry = Telemetry()
+
+    user_id = telemetry.get_cli_id()
+    assert 'user_id' not in json.loads(config_path.read_text())
+
+    telemetry.flush()
+    assert json.loads(config_path.read_text())['user_id'] == user_id